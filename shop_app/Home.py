@@ -2,71 +2,90 @@ import streamlit as st
 import sys
 from pathlib import Path
 import pandas as pd
-import json
-import os
 from datetime import datetime
 
 # Add the backend directory to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
-def export_data_to_csv():
+from backend.csv_export import export_csv
+from backend.csv_import import import_csv
+from backend.repository import create_repository
+from backend.metrics import begin_request, span
+from backend.warmup import start_warmup
+
+def export_csv_button(repo, kind, label):
+    """Offer a CSV download, building the file only once it has been asked for"""
+    # The request survives reruns; the bytes are cached per data version
+    requested = st.session_state.setdefault('csv_export_requested', set())
+    if kind not in requested:
+        if st.button(f"Prepare {label}", key=f"prepare_{kind}_csv"):
+            requested.add(kind)
+        else:
+            return
+
+    with span('page.render', page='home', block='csv_export') as timing:
+        data = export_csv(repo, kind)
+        timing.record(bytes=len(data) if data is not None else 0)
+    if data is None:
+        st.caption(f"No {label.lower()} to export yet")
+        return
+    st.download_button(
+        label=f"Download {label}",
+        data=data,
+        file_name=f'{kind}_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+        mime='text/csv'
+    )
+
+def export_data_to_csv(repo):
     """Export data to CSV files (in-memory, all columns)"""
     try:
-        # Export stock data
-        if st.session_state.stock_data:
-            stock_df = pd.DataFrame(st.session_state.stock_data)
-            stock_csv = stock_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="Download Stock Data",
-                data=stock_csv,
-                file_name=f'stock_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-                mime='text/csv'
-            )
-        # Export sales data
-        if st.session_state.sales_data and st.session_state.stock_data:
-            sales_df = pd.DataFrame(st.session_state.sales_data)
-            stock_df = pd.DataFrame(st.session_state.stock_data)
-            
-            # Merge sales with stock to get product name and purchase price
-            merged_df = pd.merge(
-                sales_df,
-                stock_df[['product_id', 'product_name', 'purchase_price']],
-                on='product_id',
-                how='left'
-            )
-            
-            # Calculate profit
-            merged_df['profit'] = (merged_df['total_price'] / merged_df['quantity_sold']) - pd.to_numeric(merged_df['purchase_price'], errors='coerce').fillna(0)
-            merged_df['profit'] = merged_df['profit'] * merged_df['quantity_sold']
-
-            # Reorder columns for a cleaner export
-            export_df = merged_df[['date_of_sale', 'product_id', 'product_name', 'quantity_sold', 'total_price', 'profit']]
-            
-            sales_csv = export_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="Download Sales Data",
-                data=sales_csv,
-                file_name=f'sales_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-                mime='text/csv'
-            )
+        export_csv_button(repo, 'stock', "Stock Data")
+        export_csv_button(repo, 'sales', "Sales Data")
     except Exception as e:
         st.error(f"Error exporting data: {str(e)}")
 
-def import_data_from_csv():
+def import_csv_file(repo, uploaded_file, kind, label):
+    """Stream one uploaded CSV into the repository with a progress bar and a bad-row report"""
+    # Uploads survive reruns, so only import each file once
+    file_key = (kind, getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size))
+    imported = st.session_state.setdefault('imported_files', {})
+    if file_key not in imported:
+        progress_bar = st.progress(0.0, text=f"Importing {label}...")
+        with span('page.render', page='home', block='csv_import') as timing:
+            imported[file_key] = import_csv(
+                repo, uploaded_file, kind,
+                progress=lambda fraction: progress_bar.progress(fraction, text=f"Importing {label}... {fraction:.0%}")
+            )
+            timing.record(rows=imported[file_key].rows_read, bytes=uploaded_file.size)
+        progress_bar.empty()
+
+    report = imported[file_key]
+    if report.rows_imported == 0:
+        st.error(f"{label} not imported: none of its {report.rows_read} rows passed validation, "
+                 f"so the current data was kept")
+    else:
+        st.success(f"{label} imported: {report.rows_imported} of {report.rows_read} rows")
+    if report.rows_rejected:
+        st.warning(f"{report.rows_rejected} rows were skipped because they failed validation")
+        st.dataframe(
+            pd.DataFrame(report.errors, columns=['line', 'problem']),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def import_data_from_csv(repo):
     """Import data from CSV files (all columns)"""
+    if not repo.supports_import:
+        st.info("CSV import replaces all data, so it is only available with local storage (memory or SQLite). "
+                "Edit the Google Sheets directly instead.")
+        return
     try:
         stock_file = st.file_uploader("Upload Stock Data CSV", type=['csv'], key="stock_upload")
         if stock_file:
-            stock_df = pd.read_csv(stock_file)
-            st.session_state.stock_data = stock_df.to_dict('records')
-            st.success("Stock data imported successfully!")
-            st.rerun()
+            import_csv_file(repo, stock_file, 'stock', "Stock data")
         sales_file = st.file_uploader("Upload Sales Data CSV", type=['csv'], key="sales_upload")
         if sales_file:
-            sales_df = pd.read_csv(sales_file)
-            st.session_state.sales_data = sales_df.to_dict('records')
-            st.success("Sales data imported successfully!")
-            st.rerun()
+            import_csv_file(repo, sales_file, 'sales', "Sales data")
     except Exception as e:
         st.error(f"Error importing data: {str(e)}")
 
@@ -79,11 +98,10 @@ st.set_page_config(
 
 st.title("Shop Management System 🏪")
 
-# Initialize session state for data storage
-if 'stock_data' not in st.session_state:
-    st.session_state.stock_data = []
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = []
+# ?trace=1 logs every timing span of this run, not only the slow ones
+begin_request('home', trace=st.query_params.get('trace') == '1')
+
+repo = create_repository()
 
 st.header("Welcome to Shop Management System")
 
@@ -92,15 +110,20 @@ st.subheader("Data Management")
 col1, col2 = st.columns(2)
 with col1:
     st.markdown("**Export your data as CSV files:**")
-    export_data_to_csv()
+    export_data_to_csv(repo)
 with col2:
     st.markdown("**Import your data from CSV files:**")
-    import_data_from_csv()
+    import_data_from_csv(repo)
 
 # Show quick summary
-if st.session_state.stock_data:
+with span('page.render', page='home', block='stock') as timing:
+    stock_df = repo.stock_frame()
+    timing.record(rows=len(stock_df))
+if not stock_df.empty:
     st.subheader("Current Stock Summary")
-    df = pd.DataFrame(st.session_state.stock_data)
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(stock_df, use_container_width=True)
 else:
-    st.info("No stock data available. Add some stock to get started!")
\ No newline at end of file
+    st.info("No stock data available. Add some stock to get started!")
+
+# Once this page is out, load what the other pages need first (no-op after the first run)
+start_warmup()
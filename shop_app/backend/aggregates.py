@@ -0,0 +1,186 @@
+import bisect
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+# Bucket layout: [revenue, profit, quantity, count]
+REVENUE, PROFIT, QUANTITY, COUNT = range(4)
+
+
+def _hour(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def whole_hours(start, end):
+    """Widen a window to the whole hours SalesAggregates resolves it to (end stays inclusive)
+
+    Pages pass the widened window to the sales index too, so the summary
+    and the rows listed under it cover exactly the same sales.
+    """
+    if start is not None:
+        start = _hour(start)
+    if end is not None:
+        end = _hour(end) + timedelta(hours=1) - timedelta(microseconds=1)
+    return start, end
+
+
+def _add(bucket, revenue, profit, quantity, count=1):
+    bucket[REVENUE] += revenue
+    bucket[PROFIT] += profit
+    bucket[QUANTITY] += quantity
+    bucket[COUNT] += count
+
+
+class SalesAggregates:
+    """Running sales totals for the Sales History dashboard
+
+    Each sale updates an hourly bucket, a daily bucket, that hour's
+    per-product bucket and the all-time per-product totals, all in O(1).
+    Window queries read buckets instead of sales, so their cost depends on
+    the number of hours/products in the window, not on the sales history.
+    Windows are resolved to whole hours: every hour bucket that overlaps
+    [start, end] is counted (see whole_hours).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hours = {}            # hour -> bucket
+        self._hour_keys = []        # sorted hours
+        self._days = {}             # date -> bucket
+        self._hour_products = {}    # hour -> {product_id: bucket}
+        self._products = {}         # product_id -> bucket
+        self._names = {}            # product_id -> product_name
+
+    @classmethod
+    def from_frame(cls, sales_df):
+        """Build aggregates from a full sales frame (with cost basis) in one vectorized pass"""
+        aggregates = cls()
+        if sales_df.empty:
+            return aggregates
+
+        frame = pd.DataFrame({
+            'hour': sales_df['date_of_sale'].dt.floor('h'),
+            'product_id': sales_df['product_id'],
+            'revenue': sales_df['total_price'],
+            'profit': sales_df['total_price'] - sales_df['unit_cost'].fillna(0) * sales_df['quantity_sold'],
+            'quantity': sales_df['quantity_sold'],
+            'count': 1,
+        })
+        grouped = frame.groupby(['hour', 'product_id'], sort=True)[['revenue', 'profit', 'quantity', 'count']].sum()
+        for (hour, product_id), revenue, profit, quantity, count in zip(
+                grouped.index, grouped['revenue'], grouped['profit'], grouped['quantity'], grouped['count']):
+            aggregates._add_bucket(hour.to_pydatetime(), product_id, revenue, profit, quantity, count)
+        # Latest name recorded for each product
+        named = sales_df[sales_df['product_name'].notna()]
+        aggregates._names = dict(zip(named['product_id'], named['product_name']))
+        return aggregates
+
+    def add_sale(self, sale):
+        """Fold one SaleRecord (with its cost basis) into every bucket"""
+        profit = sale.total_price - (sale.unit_cost or 0.0) * sale.quantity_sold
+        with self._lock:
+            self._add_bucket(_hour(sale.date_of_sale), sale.product_id,
+                             sale.total_price, profit, sale.quantity_sold, 1)
+            if sale.product_name is not None:
+                self._names[sale.product_id] = sale.product_name
+
+    def set_product_name(self, product_id, product_name):
+        with self._lock:
+            self._names[product_id] = product_name
+
+    def summary(self, start=None, end=None):
+        """Totals for the window: revenue, profit, number of sales and unique products"""
+        with self._lock:
+            if start is None and end is None:
+                buckets = self._products.values()
+                total = [0.0, 0.0, 0, 0]
+                for bucket in buckets:
+                    _add(total, *bucket)
+                unique = sum(1 for bucket in buckets if bucket[COUNT])
+            else:
+                total = [0.0, 0.0, 0, 0]
+                products = set()
+                for hour in self._window(start, end):
+                    _add(total, *self._hours[hour])
+                    products.update(self._hour_products[hour])
+                unique = len(products)
+        return {
+            'total_sales': total[REVENUE],
+            'total_profit': total[PROFIT],
+            'quantity_sold': total[QUANTITY],
+            'num_sales': total[COUNT],
+            'unique_products': unique,
+        }
+
+    def daily(self, start=None, end=None):
+        """DataFrame of date, total_price and profit per day in the window"""
+        with self._lock:
+            if start is None and end is None:
+                rows = [(day, bucket[REVENUE], bucket[PROFIT]) for day, bucket in sorted(self._days.items())]
+            else:
+                days = {}
+                for hour in self._window(start, end):
+                    _add(days.setdefault(hour.date(), [0.0, 0.0, 0, 0]), *self._hours[hour])
+                rows = [(day, bucket[REVENUE], bucket[PROFIT]) for day, bucket in sorted(days.items())]
+        return pd.DataFrame(rows, columns=['date', 'total_price', 'profit'])
+
+    def series(self, start=None, end=None, freq='D'):
+        """DataFrame of period, total_price and profit per pandas freq bucket in the window
+
+        Daily and coarser buckets over all time are built from the daily
+        totals; anything else from the hourly buckets in the window.
+        """
+        with self._lock:
+            if start is None and end is None and freq != 'h':
+                rows = [(pd.Timestamp(day), bucket[REVENUE], bucket[PROFIT]) for day, bucket in self._days.items()]
+            else:
+                rows = [(hour, self._hours[hour][REVENUE], self._hours[hour][PROFIT]) for hour in self._window(start, end)]
+        frame = pd.DataFrame(rows, columns=['period', 'total_price', 'profit'])
+        if frame.empty:
+            return frame
+        return frame.set_index('period').sort_index().resample(freq).sum().reset_index()
+
+    def product_totals(self, start=None, end=None):
+        """DataFrame of product_id, product_name, total_price, profit, quantity_sold in the window"""
+        with self._lock:
+            if start is None and end is None:
+                products = self._products
+            else:
+                products = {}
+                for hour in self._window(start, end):
+                    for product_id, bucket in self._hour_products[hour].items():
+                        _add(products.setdefault(product_id, [0.0, 0.0, 0, 0]), *bucket)
+            rows = [
+                (product_id, self._names.get(product_id, 'N/A'), bucket[REVENUE], bucket[PROFIT], bucket[QUANTITY])
+                for product_id, bucket in products.items() if bucket[COUNT]
+            ]
+        return pd.DataFrame(rows, columns=['product_id', 'product_name', 'total_price', 'profit', 'quantity_sold'])
+
+    def top_products(self, start=None, end=None, n=10, by='total_price'):
+        """The n best products in the window by total_price or profit"""
+        return self.product_totals(start, end).nlargest(n, by)
+
+    def first_sale_hour(self):
+        with self._lock:
+            return self._hour_keys[0] if self._hour_keys else None
+
+    def last_sale_hour(self):
+        with self._lock:
+            return self._hour_keys[-1] if self._hour_keys else None
+
+    def _window(self, start, end):
+        lo = 0 if start is None else bisect.bisect_left(self._hour_keys, _hour(pd.Timestamp(start).to_pydatetime()))
+        hi = len(self._hour_keys) if end is None else bisect.bisect_right(self._hour_keys, pd.Timestamp(end).to_pydatetime())
+        return self._hour_keys[lo:hi]
+
+    def _add_bucket(self, hour, product_id, revenue, profit, quantity, count):
+        if hour not in self._hours:
+            self._hours[hour] = [0.0, 0.0, 0, 0]
+            self._hour_products[hour] = {}
+            # Sales normally arrive in time order, making this an append
+            bisect.insort(self._hour_keys, hour)
+        _add(self._hours[hour], revenue, profit, quantity, count)
+        _add(self._days.setdefault(hour.date(), [0.0, 0.0, 0, 0]), revenue, profit, quantity, count)
+        _add(self._hour_products[hour].setdefault(product_id, [0.0, 0.0, 0, 0]), revenue, profit, quantity, count)
+        _add(self._products.setdefault(product_id, [0.0, 0.0, 0, 0]), revenue, profit, quantity, count)
@@ -0,0 +1,118 @@
+import bisect
+import threading
+
+from .models import StockItem
+
+
+class StockCatalog:
+    """Stock items indexed by product_id and by name
+
+    Lookups by ID or exact name are dict hits, the set of products with
+    quantity > 0 is maintained as quantities change, and name searches use a
+    sorted name list, so none of the operations scan the whole catalog.
+    """
+
+    def __init__(self, items=()):
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_name = {}
+        self._in_stock = {}  # Insertion-ordered set of product IDs
+        self._sorted_names = []  # (casefolded name, product_id)
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Build a catalog from a repository stock frame"""
+        return cls(StockItem(**record) for record in frame.to_dict('records'))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, product_id):
+        return product_id in self._by_id
+
+    def items(self):
+        return list(self._by_id.values())
+
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def find_by_name(self, name):
+        """All items with exactly this product name"""
+        return [self._by_id[product_id] for product_id in self._by_name.get(name, ())]
+
+    def in_stock_count(self):
+        return len(self._in_stock)
+
+    def in_stock(self):
+        """Items with quantity > 0, in the order they were added"""
+        return [self._by_id[product_id] for product_id in self._in_stock]
+
+    def search(self, text='', limit=100):
+        """Up to limit in-stock items whose name starts with text (case-insensitive), by name"""
+        key = text.strip().casefold()
+        results = []
+        with self._lock:
+            position = bisect.bisect_left(self._sorted_names, (key, ''))
+            while position < len(self._sorted_names) and len(results) < limit:
+                name, product_id = self._sorted_names[position]
+                if not name.startswith(key):
+                    break
+                if product_id in self._in_stock:
+                    results.append(self._by_id[product_id])
+                position += 1
+        return results
+
+    def add(self, item):
+        with self._lock:
+            if item.product_id in self._by_id:
+                raise ValueError(f"Product ID {item.product_id} already exists")
+            self._by_id[item.product_id] = item
+            self._by_name.setdefault(item.product_name, {})[item.product_id] = None
+            bisect.insort(self._sorted_names, (item.product_name.casefold(), item.product_id))
+            self._update_stock_flag(item)
+        return item
+
+    def put(self, item):
+        """Add item, replacing any item that has the same Product ID"""
+        with self._lock:
+            previous = self._by_id.pop(item.product_id, None)
+            if previous is not None:
+                names = self._by_name[previous.product_name]
+                del names[previous.product_id]
+                if not names:
+                    del self._by_name[previous.product_name]
+                entry = (previous.product_name.casefold(), previous.product_id)
+                del self._sorted_names[bisect.bisect_left(self._sorted_names, entry)]
+                self._in_stock.pop(previous.product_id, None)
+            return self.add(item)
+
+    def set_quantity(self, product_id, quantity):
+        with self._lock:
+            item = self._require(product_id)
+            item.quantity = quantity
+            self._update_stock_flag(item)
+            return item
+
+    def decrement(self, product_id, quantity):
+        """Take quantity out of stock in place; raises ValueError if there is too little"""
+        with self._lock:
+            item = self._require(product_id)
+            if quantity > item.quantity:
+                raise ValueError(f"Only {item.quantity} units of {item.product_name} in stock")
+            item.quantity -= quantity
+            self._update_stock_flag(item)
+            return item
+
+    def _require(self, product_id):
+        item = self._by_id.get(product_id)
+        if item is None:
+            raise ValueError(f"Product ID {product_id} not found")
+        return item
+
+    def _update_stock_flag(self, item):
+        if item.quantity > 0:
+            self._in_stock.setdefault(item.product_id, None)
+        else:
+            self._in_stock.pop(item.product_id, None)
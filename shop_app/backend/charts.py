@@ -0,0 +1,109 @@
+import math
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+MAX_CHART_POINTS = 120
+SPEC_CACHE_ENTRIES = 32
+
+# (label, pandas frequency, bucket width) from finest to coarsest
+RESOLUTIONS = [
+    ('Hourly', 'h', pd.Timedelta(hours=1)),
+    ('Daily', 'D', pd.Timedelta(days=1)),
+    ('Weekly', 'W-MON', pd.Timedelta(weeks=1)),
+    ('Monthly', 'MS', pd.Timedelta(days=31)),
+]
+
+_specs = weakref.WeakKeyDictionary()  # repository -> OrderedDict(key -> (version, spec))
+_specs_lock = threading.Lock()
+
+
+def choose_resolution(start, end, max_points=MAX_CHART_POINTS):
+    """Finest (label, freq) that keeps the window within max_points buckets"""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for label, freq, width in RESOLUTIONS:
+        if span / width <= max_points:
+            return label, freq
+    return RESOLUTIONS[-1][:2]
+
+
+def sales_trend(aggregates, start=None, end=None, max_points=MAX_CHART_POINTS):
+    """Revenue and profit per time bucket for the window, at most max_points rows
+
+    Returns (frame, label). Buckets are summed server-side from the hourly
+    aggregates; windows longer than max_points months merge whole months.
+    """
+    first = start if start is not None else aggregates.first_sale_hour()
+    last = end if end is not None else aggregates.last_sale_hour()
+    if first is None or last is None:
+        return pd.DataFrame(columns=['period', 'total_price', 'profit']), RESOLUTIONS[1][0]
+
+    label, freq = choose_resolution(first, last, max_points)
+    frame = aggregates.series(start, end, freq)
+    if len(frame) > max_points:
+        step = math.ceil(len(frame) / max_points)
+        frame = frame.groupby(frame.index // step).agg(
+            {'period': 'first', 'total_price': 'sum', 'profit': 'sum'}
+        )
+        label = f"{label} (x{step})"
+    return frame, label
+
+
+def trend_spec(frame, label):
+    """Vega-Lite spec for the sales trend bar chart"""
+    # Altair is only needed on a spec cache miss, not to import the page
+    import altair as alt
+
+    chart = alt.Chart(frame).mark_bar(color='#4F8DFD').encode(
+        x=alt.X('period:T', title='Date'),
+        y=alt.Y('total_price:Q', title='Total Sales'),
+        tooltip=[alt.Tooltip('period:T', title='Period'), alt.Tooltip('total_price:Q', title='Total Sales ($)', format=',.2f'), alt.Tooltip('profit:Q', title='Profit ($)', format=',.2f')]
+    ).properties(
+        title=f'Total Sales ({label})',
+        height=350
+    )
+    return chart.interactive().to_dict()
+
+
+def top_products_spec(frame, by, title, color):
+    """Vega-Lite spec for a top-products bar chart ranked by total_price or profit"""
+    import altair as alt
+
+    other = 'profit' if by == 'total_price' else 'total_price'
+    titles = {'total_price': 'Total Sales ($)', 'profit': 'Total Profit ($)'}
+    chart = alt.Chart(frame).mark_bar(size=20, color=color).encode(
+        x=alt.X(f'{by}:Q', title=titles[by], axis=alt.Axis(format=',.2f')),
+        y=alt.Y('product_name:N', sort='-x', title='Product'),
+        tooltip=[alt.Tooltip('product_name:N', title='Product'), alt.Tooltip(f'{by}:Q', title=titles[by], format=',.2f'), alt.Tooltip(f'{other}:Q', title=titles[other], format=',.2f')]
+    ).properties(
+        title=title,
+        height=350
+    )
+    return chart.interactive().to_dict()
+
+
+def window_key(start=None, end=None):
+    """Cache key for a window; aggregates resolve windows to whole hours anyway"""
+    return tuple(None if bound is None else pd.Timestamp(bound).floor('h') for bound in (start, end))
+
+
+def cached_spec(repo, name, window, build):
+    """Return the spec for (name, window) at the repository's data version, building it if needed"""
+    version = repo.version
+    key = (name, window)
+    with _specs_lock:
+        specs = _specs.setdefault(repo, OrderedDict())
+        cached = specs.get(key)
+        if cached is not None and cached[0] == version:
+            specs.move_to_end(key)
+            return cached[1]
+
+    spec = build()
+    with _specs_lock:
+        specs[key] = (version, spec)
+        specs.move_to_end(key)
+        while len(specs) > SPEC_CACHE_ENTRIES:
+            specs.popitem(last=False)
+    return spec
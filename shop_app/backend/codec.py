@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Google Sheets serial dates count days from this epoch
+SHEETS_EPOCH = pd.Timestamp('1899-12-30')
+
+# printf-style format for st.column_config.NumberColumn
+CURRENCY_DISPLAY_FORMAT = '$%.2f'
+DATETIME_DISPLAY_FORMAT = 'YYYY-MM-DD HH:mm'
+
+TEXT, FLOAT, INT, DATETIME, CATEGORY = 'text', 'float', 'int', 'datetime', 'category'
+
+
+def to_text(values):
+    """Column of strings; whole numbers (e.g. numeric IDs) lose their trailing .0"""
+    values = pd.Series(values, dtype=object)
+    text = values.astype(str).where(values.notna(), '')
+    whole = text.str.endswith('.0') & pd.to_numeric(values, errors='coerce').notna()
+    if whole.any():
+        text[whole] = text[whole].str[:-2]
+    return text
+
+
+def to_datetime(values):
+    """datetime64 column from Sheets serial numbers and/or date strings"""
+    values = pd.Series(values, dtype=object)
+    serials = pd.to_numeric(values, errors='coerce')
+    result = SHEETS_EPOCH + pd.to_timedelta(serials, unit='D')
+    strings = serials.isna() & values.notna() & (values != '')
+    if strings.any():
+        result[strings] = pd.to_datetime(values[strings], errors='coerce')
+    # Serial dates carry floating-point noise below a second
+    return result.dt.round('s')
+
+
+def to_number(values, dtype):
+    """float64/int64 column; blanks and unparseable cells become NaN (floats) or 0 (ints)"""
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    if dtype != 'float64':
+        numbers = numbers.fillna(0)
+    return numbers.astype(dtype)
+
+
+def format_currency(values, symbol='$'):
+    """Vectorized '$1.23' strings for a numeric column (one C-level pass, no per-row lambda)"""
+    index = getattr(values, 'index', None)
+    numbers = np.asarray(pd.to_numeric(values, errors='coerce'), dtype=float)
+    text = np.char.mod(f'{symbol}%.2f', np.nan_to_num(numbers))
+    return pd.Series(text, index=index, dtype=object)
+
+
+class SheetCodec:
+    """Typed decoding for the raw rows of one sheet
+
+    Rows are read with valueRenderOption=UNFORMATTED_VALUE, so numbers arrive
+    as numbers and dates as serial numbers. decode() turns them into
+    float64/int64/datetime64/category columns once, with one vectorized
+    conversion per column, so consumers never re-parse strings.
+    """
+
+    def __init__(self, columns, kinds):
+        self.columns = list(columns)
+        self.kinds = kinds
+
+    def empty(self):
+        return self.decode([])
+
+    def decode(self, rows):
+        """Typed DataFrame from a list of row lists (short rows are padded)"""
+        raw = pd.DataFrame(rows, columns=self.columns, dtype=object) if rows else \
+            pd.DataFrame({column: pd.Series(dtype=object) for column in self.columns})
+        return pd.DataFrame(
+            {column: self.decode_column(raw[column], self.kinds.get(column, TEXT)) for column in self.columns},
+            columns=self.columns
+        )
+
+    @staticmethod
+    def decode_column(values, kind):
+        if kind == FLOAT:
+            return to_number(values, 'float64')
+        if kind == INT:
+            return to_number(values, 'int64')
+        if kind == DATETIME:
+            return to_datetime(values)
+        if kind == CATEGORY:
+            return to_text(values).astype('category')
+        return to_text(values)
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+# Column kinds
+FLOAT, INT, TIMESTAMP, INTERNED = 'float64', 'int64', 'timestamp', 'interned'
+
+_STORAGE = {FLOAT: np.float64, INT: np.int64, TIMESTAMP: np.int64, INTERNED: np.int32}
+_MISSING = {FLOAT: np.nan, INT: 0, TIMESTAMP: np.iinfo(np.int64).min, INTERNED: 0}
+
+
+class InternTable:
+    """Distinct strings stored once and referred to by int32 code (code 0 is None)"""
+
+    def __init__(self):
+        self._values = [None]
+        self._codes = {None: 0}
+        self._array = None
+
+    def __len__(self):
+        return len(self._values)
+
+    def intern(self, value):
+        if value is None or value != value:  # None or NaN
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+            self._array = None
+        return code
+
+    def intern_many(self, values):
+        """Codes for a column, interning only its distinct values"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        table_codes = np.array([self.intern(value) for value in uniques] + [0], dtype=np.int32)
+        return table_codes[codes]  # -1 (missing) picks the trailing 0
+
+    def lookup(self, codes):
+        """Object array of the strings for codes (pointers to the interned strings, no copies)"""
+        if self._array is None or len(self._array) != len(self._values):
+            self._array = np.array(self._values, dtype=object)
+        return self._array.take(codes)
+
+    def dictionary(self):
+        return list(self._values)
+
+
+class ColumnStore:
+    """Append-only table of typed numpy columns
+
+    Each column is one growable array (float64, int64, int64 epoch
+    nanoseconds, or int32 codes into a shared InternTable), so a row costs a
+    few dozen bytes instead of a dict of Python objects. Appends are
+    amortized O(1); exports hand out read-only views of the filled part of
+    the arrays, which later appends never modify.
+    """
+
+    def __init__(self, schema, capacity=1024):
+        self.schema = dict(schema)
+        self._size = 0
+        self._capacity = capacity
+        self._arrays = {name: self._allocate(kind, capacity) for name, kind in self.schema.items()}
+        self._interned = {name: InternTable() for name, kind in self.schema.items() if kind == INTERNED}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays (allocated capacity, excluding interned strings)"""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def append(self, row):
+        """Append one row given as a mapping of column name to value"""
+        self._reserve(self._size + 1)
+        position = self._size
+        for name, kind in self.schema.items():
+            self._arrays[name][position] = self._encode(name, kind, row.get(name))
+        self._size += 1
+
+    def extend(self, frame):
+        """Append every row of a DataFrame with one vectorized conversion per column"""
+        count = len(frame)
+        if not count:
+            return
+        self._reserve(self._size + count)
+        start, stop = self._size, self._size + count
+        for name, kind in self.schema.items():
+            values = frame[name] if name in frame.columns else pd.Series([None] * count, dtype=object)
+            self._arrays[name][start:stop] = self._encode_many(name, kind, values)
+        self._size = stop
+
+    def clear(self):
+        self._size = 0
+        self._arrays = {name: self._allocate(kind, self._capacity) for name, kind in self.schema.items()}
+        self._interned = {name: InternTable() for name, kind in self.schema.items() if kind == INTERNED}
+
+    def column(self, name):
+        """Read-only view of a column's filled values in storage form"""
+        view = self._arrays[name][:self._size]
+        view.setflags(write=False)
+        return view
+
+    def to_frame(self):
+        """DataFrame of the store; numeric and timestamp columns are zero-copy views"""
+        columns = {}
+        for name, kind in self.schema.items():
+            view = self.column(name)
+            if kind == TIMESTAMP:
+                columns[name] = view.view('datetime64[ns]')
+            elif kind == INTERNED:
+                values = self._interned[name].lookup(view)
+                values.setflags(write=False)
+                columns[name] = values
+            else:
+                columns[name] = view
+        return pd.DataFrame(columns, columns=list(self.schema), copy=False)
+
+    def to_arrow(self):
+        """pyarrow Table of the store; interned columns become dictionary arrays (zero-copy codes)"""
+        import pyarrow as pa
+
+        arrays = []
+        for name, kind in self.schema.items():
+            view = self.column(name)
+            if kind == TIMESTAMP:
+                arrays.append(pa.array(view.view('datetime64[ns]')))
+            elif kind == INTERNED:
+                dictionary = pa.array(self._interned[name].dictionary(), type=pa.string())
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(view), dictionary))
+            else:
+                arrays.append(pa.array(view))
+        return pa.Table.from_arrays(arrays, names=list(self.schema))
+
+    def _reserve(self, size):
+        if size <= len(next(iter(self._arrays.values()))):
+            return
+        capacity = max(size, 2 * len(next(iter(self._arrays.values()))))
+        for name, kind in self.schema.items():
+            # A new buffer: views handed out earlier keep pointing at the old one
+            grown = self._allocate(kind, capacity)
+            grown[:self._size] = self._arrays[name][:self._size]
+            self._arrays[name] = grown
+
+    @staticmethod
+    def _allocate(kind, capacity):
+        return np.full(capacity, _MISSING[kind], dtype=_STORAGE[kind])
+
+    def _encode(self, name, kind, value):
+        if kind == INTERNED:
+            return self._interned[name].intern(value)
+        if value is None:
+            return _MISSING[kind]
+        if kind == TIMESTAMP:
+            return pd.Timestamp(value).value
+        return value
+
+    def _encode_many(self, name, kind, values):
+        if kind == INTERNED:
+            return self._interned[name].intern_many(values)
+        if kind == TIMESTAMP:
+            return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        values = pd.to_numeric(values, errors='coerce')
+        if kind == INT:
+            values = values.fillna(0)
+        return values.to_numpy(dtype=_STORAGE[kind])
@@ -1,8 +1,28 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _find_dotenv():
+    """Nearest .env from the app directory upwards (DOTENV_PATH overrides), or None"""
+    if os.getenv('DOTENV_PATH'):
+        return os.getenv('DOTENV_PATH')
+    directory = APP_DIR
+    while True:
+        candidate = os.path.join(directory, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# Load environment variables; python-dotenv is only imported when there is a file to read
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
 
 # Google Sheets Configuration
 GOOGLE_SHEETS_CREDENTIALS_FILE = os.getenv('GOOGLE_SHEETS_CREDENTIALS_FILE')
@@ -19,6 +39,62 @@ API_PORT = int(os.getenv('API_PORT', 8000))
 # Frontend Configuration
 FRONTEND_HOST = os.getenv('FRONTEND_HOST', 'localhost')
 
+# Storage backend for the pages: 'memory' (per server process), 'sqlite' or 'sheets'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'memory')
+SQLITE_PATH = os.getenv(
+    'SQLITE_PATH',
+    os.path.join(APP_DIR, 'data', 'shop.db')
+)
+
+# Local copy of the Sheets API discovery document, written the first time it has to be downloaded
+SHEETS_DISCOVERY_PATH = os.getenv('SHEETS_DISCOVERY_PATH', os.path.join(APP_DIR, 'data', 'sheets_v4_discovery.json'))
+
+# Sheets API quota (requests per minute per user) and retry budget
+SHEETS_REQUESTS_PER_MINUTE = int(os.getenv('SHEETS_REQUESTS_PER_MINUTE', 60))
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', 5))
+
+# Write-behind queue for Sheets appends
+WRITE_QUEUE_JOURNAL = os.getenv(
+    'WRITE_QUEUE_JOURNAL',
+    os.path.join(APP_DIR, 'data', 'write_queue.jsonl')
+)
+WRITE_QUEUE_MAX_ROWS = int(os.getenv('WRITE_QUEUE_MAX_ROWS', 50))
+WRITE_QUEUE_MAX_AGE_SECONDS = float(os.getenv('WRITE_QUEUE_MAX_AGE_SECONDS', 2.0))
+
+# Read-through cache for sheet reads
+READ_CACHE_TTL_SECONDS = float(os.getenv('READ_CACHE_TTL_SECONDS', 30))
+READ_CACHE_MAX_STALE_SECONDS = float(os.getenv('READ_CACHE_MAX_STALE_SECONDS', 300))
+READ_CACHE_MAX_ENTRIES = int(os.getenv('READ_CACHE_MAX_ENTRIES', 16))
+# Full re-download interval for the incrementally read Sales sheet
+SALES_RESYNC_SECONDS = float(os.getenv('SALES_RESYNC_SECONDS', 600))
+
+# Local Sheets API emulator in place of Google (offline load tests and benchmarks)
+SHEETS_EMULATOR = os.getenv('SHEETS_EMULATOR', '').lower() in ('1', 'true', 'yes')
+SHEETS_EMULATOR_LATENCY_MS = float(os.getenv('SHEETS_EMULATOR_LATENCY_MS', 0))
+SHEETS_EMULATOR_JITTER_MS = float(os.getenv('SHEETS_EMULATOR_JITTER_MS', 0))
+SHEETS_EMULATOR_QUOTA_PER_MINUTE = int(os.getenv('SHEETS_EMULATOR_QUOTA_PER_MINUTE', 0))  # 0 = unlimited
+SHEETS_EMULATOR_ERROR_RATE = float(os.getenv('SHEETS_EMULATOR_ERROR_RATE', 0))  # Random 429s
+SHEETS_EMULATOR_EDIT_RATE = float(os.getenv('SHEETS_EMULATOR_EDIT_RATE', 0))  # Edits by "other users"
+SHEETS_EMULATOR_SEED = int(os.getenv('SHEETS_EMULATOR_SEED')) if os.getenv('SHEETS_EMULATOR_SEED') else None
+if SHEETS_EMULATOR and not SPREADSHEET_ID:
+    SPREADSHEET_ID = 'emulator'
+
+# Background Excel exports: worker pool and the size-bounded cache of finished files
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', 2))
+# Where the xlsx files are written, 'process' or 'thread'; Sheets are always read in the server process
+EXPORT_JOB_EXECUTOR = os.getenv('EXPORT_JOB_EXECUTOR', 'process')
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', os.path.join(APP_DIR, 'data', 'exports'))
+EXPORT_CACHE_MAX_MB = float(os.getenv('EXPORT_CACHE_MAX_MB', 200))
+# How long failed and empty exports are still reported before the runner forgets them
+EXPORT_JOB_TTL_SECONDS = float(os.getenv('EXPORT_JOB_TTL_SECONDS', 600))
+
+# Timing spans: /metrics endpoint (0 = off), JSON-lines span log, slow-span threshold
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_LOG_PATH = os.getenv('METRICS_LOG_PATH', '')
+METRICS_SLOW_SPAN_MS = float(os.getenv('METRICS_SLOW_SPAN_MS', 1000))
+# Log every span of every page run, as ?trace=1 does for a single run
+METRICS_TRACE_ALL = os.getenv('METRICS_TRACE_ALL', '').lower() in ('1', 'true', 'yes')
+
 def validate_config():
     """Validate that all required configuration is present and valid."""
     missing = []
@@ -0,0 +1,60 @@
+import io
+import threading
+import weakref
+
+from .repository import sales_profit
+
+DEFAULT_CHUNK_ROWS = 20_000
+
+SALES_EXPORT_COLUMNS = [
+    'date_of_sale', 'product_id', 'product_name', 'quantity_sold',
+    'unit_price', 'unit_cost', 'total_price', 'profit'
+]
+
+_cache = weakref.WeakKeyDictionary()  # repository -> {kind: (version, bytes)}
+_cache_lock = threading.Lock()
+
+
+def iter_csv(frame, chunk_rows=DEFAULT_CHUNK_ROWS, encoding='utf-8'):
+    """Yield a frame as encoded CSV, chunk_rows rows at a time
+
+    Only one chunk is ever formatted as text, instead of the whole frame.
+    """
+    yield frame.iloc[:0].to_csv(index=False).encode(encoding)
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode(encoding)
+
+
+def write_csv(frame, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stream a frame into CSV bytes"""
+    buffer = io.BytesIO()
+    for chunk in iter_csv(frame, chunk_rows):
+        buffer.write(chunk)
+    return buffer.getvalue()
+
+
+def sales_export_frame(sales_df):
+    """Sales with profit from their own cost basis, in export column order"""
+    return sales_df.assign(profit=sales_profit(sales_df))[SALES_EXPORT_COLUMNS]
+
+
+def export_csv(repo, kind):
+    """CSV bytes of 'stock' or 'sales' for the repository's current data version
+
+    Built on first request and reused until the data changes, so page reruns
+    do not re-serialize the history. Returns None when there is nothing to export.
+    """
+    snapshot = repo.snapshot()
+    with _cache_lock:
+        cached = _cache.get(repo, {}).get(kind)
+    if cached is not None and cached[0] == snapshot.version:
+        return cached[1]
+
+    if kind == 'stock':
+        data = write_csv(snapshot.stock) if not snapshot.stock.empty else None
+    else:
+        data = write_csv(sales_export_frame(snapshot.sales)) if not snapshot.sales.empty else None
+
+    with _cache_lock:
+        _cache.setdefault(repo, {})[kind] = (snapshot.version, data)
+    return data
@@ -0,0 +1,163 @@
+import typing
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .models import StockItem, SaleRecord
+from .repository import STOCK_FIELDS, SALE_FIELDS, STOCK_DTYPES, SALE_DTYPES
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+class ImportReport:
+    """Outcome of a CSV import: row counts and the first max_errors bad rows"""
+
+    def __init__(self, max_errors=100):
+        self.max_errors = max_errors
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.errors = []  # (line number, message)
+
+    def reject(self, lines, message):
+        self.rows_rejected += len(lines)
+        room = self.max_errors - len(self.errors)
+        if room > 0:
+            self.errors.extend((int(line), message) for line in lines[:room])
+
+
+def _field_specs(model):
+    """(name, base type, required) for each field of a pydantic model"""
+    fields = getattr(model, 'model_fields', None) or model.__fields__
+    hints = typing.get_type_hints(model)
+    specs = []
+    for name, field in fields.items():
+        hint = hints[name]
+        args = typing.get_args(hint)
+        if typing.get_origin(hint) is typing.Union and type(None) in args:
+            hint = next(arg for arg in args if arg is not type(None))
+        required = field.is_required() if hasattr(field, 'is_required') else bool(field.required)
+        specs.append((name, hint, required))
+    return specs
+
+
+class ChunkValidator:
+    """Coerces raw CSV chunks to a model's typed columns in bulk
+
+    Field types and required/optional status come from the pydantic model;
+    every column is converted with one vectorized call per chunk and rows that
+    fail are reported by CSV line number instead of aborting the import.
+    """
+
+    def __init__(self, model, fields, dtypes, report):
+        self.model = model
+        self.specs = [spec for spec in _field_specs(model) if spec[0] in fields]
+        self.fields = fields
+        self.dtypes = dtypes
+        self.report = report
+        self.started_at = pd.Timestamp(datetime.now())
+
+    def check_header(self, columns):
+        """Return the required fields missing from the CSV header"""
+        return [name for name, _, required in self.specs if required and name not in columns]
+
+    def validate(self, chunk, first_line):
+        """Return the valid rows of chunk as a typed frame"""
+        lines = np.arange(first_line, first_line + len(chunk))
+        bad = np.zeros(len(chunk), dtype=bool)
+        columns = {}
+
+        for name, kind, required in self.specs:
+            raw = chunk[name] if name in chunk.columns else pd.Series(np.nan, index=chunk.index)
+            missing = raw.isna() | (raw.astype(str).str.strip() == '')
+
+            if kind is str:
+                values = raw.astype(str).str.strip().where(~missing, None)
+                invalid = missing.to_numpy() if required else np.zeros(len(chunk), dtype=bool)
+            elif kind is datetime:
+                values = pd.to_datetime(raw, errors='coerce')
+                invalid = (values.isna() & ~missing).to_numpy()
+                values = values.fillna(self.started_at)  # Models default dates to "now"
+            else:
+                values = pd.to_numeric(raw, errors='coerce')
+                # Blank optional numbers stay NaN; anything else must parse and be non-negative
+                invalid = ((values.isna() & (~missing | required)) | (values < 0)).to_numpy()
+                if kind is int:
+                    invalid |= (values.fillna(0) % 1 != 0).to_numpy()
+                    values = values.fillna(0).round()
+
+            self._reject(lines, bad, invalid, f"invalid or missing {name}")
+            columns[name] = values
+
+        if self.model is StockItem:
+            # Stock rows without an ID get one, as ensure_product_id would
+            ids = columns['product_id']
+            missing_ids = ids.isna()
+            if missing_ids.any():
+                ids = ids.copy()
+                ids[missing_ids] = [str(uuid.uuid4()) for _ in range(int(missing_ids.sum()))]
+                columns['product_id'] = ids
+
+        valid = pd.DataFrame(columns, columns=self.fields)[~bad]
+        return valid.astype(self.dtypes)
+
+    def _reject(self, lines, bad, invalid, message):
+        newly_bad = invalid & ~bad
+        if newly_bad.any():
+            self.report.reject(lines[newly_bad], message)
+        bad |= invalid
+
+
+def read_validated_chunks(source, kind, report, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """Yield typed, validated frames from a seekable CSV stream, chunk_rows at a time
+
+    kind is 'stock' or 'sales'. progress(fraction) is called after each chunk
+    when the source size is known. Raises ValueError if required columns are
+    missing from the header.
+    """
+    if kind == 'stock':
+        validator = ChunkValidator(StockItem, STOCK_FIELDS, STOCK_DTYPES, report)
+    else:
+        validator = ChunkValidator(SaleRecord, SALE_FIELDS, SALE_DTYPES, report)
+
+    size = getattr(source, 'size', None)
+    if size is None:
+        size = source.seek(0, 2)
+        source.seek(0)
+
+    # Checked on its own, before any rows: a file with only a header has no chunk to look at
+    header = pd.read_csv(source, nrows=0, dtype=str).columns
+    source.seek(0)
+    missing = validator.check_header(header)
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    # Read everything as text; coercion happens in validate() so bad cells are reported, not fatal
+    reader = pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[''])
+    first_line = 2  # Line 1 is the header
+    for chunk in reader:
+        report.rows_read += len(chunk)
+        valid = validator.validate(chunk, first_line)
+        report.rows_imported += len(valid)
+        first_line += len(chunk)
+        if progress is not None and size:
+            progress(min(source.tell() / size, 1.0))
+        yield valid
+
+
+def import_csv(repo, source, kind, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None, max_errors=100):
+    """Stream a stock or sales CSV into the repository, replacing its current data
+
+    Returns an ImportReport. If no row passes validation the current data is
+    kept (report.rows_imported == 0). Only one chunk of raw text is held at a time.
+    Line numbers assume no quoted fields contain line breaks.
+    """
+    report = ImportReport(max_errors)
+    chunks = read_validated_chunks(source, kind, report, chunk_rows, progress)
+    if kind == 'stock':
+        repo.import_stock(chunks)
+    else:
+        repo.import_sales(chunks)
+    return report
@@ -0,0 +1,95 @@
+import os
+
+from .metrics import span
+
+CURRENCY_FORMAT = '"$"#,##0.00'
+DATE_FORMAT = 'yyyy-mm-dd'
+DATETIME_FORMAT = 'yyyy-mm-dd hh:mm'
+DEFAULT_CHUNK_ROWS = 5_000
+
+
+class StreamingWorkbook:
+    """Write-only openpyxl workbook that streams DataFrames row by row
+
+    Rows go straight to the sheet's temporary XML file instead of building a
+    cell object model, so memory stays flat as sheets grow. Numbers and dates
+    are written as real values; currency and date display comes from cell
+    number formats, not pre-formatted strings.
+    """
+
+    def __init__(self):
+        # Imported here so modules that only reference the formats don't load openpyxl
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+
+    def add_sheet(self, title, frame, number_formats=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+        """Append a sheet with a header row and one row per frame row
+
+        number_formats maps column names to Excel number formats;
+        progress(fraction) is called after each chunk of rows is written.
+        """
+        from openpyxl.cell import WriteOnlyCell
+
+        sheet = self._workbook.create_sheet(title)
+        sheet.append(list(frame.columns))
+
+        # One template cell per formatted column; openpyxl shares the style between cells
+        formats = [(position, number_formats[name])
+                   for position, name in enumerate(frame.columns) if name in (number_formats or {})]
+        for start in range(0, len(frame), chunk_rows):
+            chunk = frame.iloc[start:start + chunk_rows]
+            # Python scalars with None for missing values; NaN/NaT are not valid cell values
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False, name=None):
+                if formats:
+                    row = list(row)
+                    for position, number_format in formats:
+                        cell = WriteOnlyCell(sheet, value=row[position])
+                        cell.number_format = number_format
+                        row[position] = cell
+                sheet.append(row)
+            if progress is not None:
+                progress((start + len(chunk)) / len(frame))
+        return sheet
+
+    def save(self, filename):
+        self._workbook.save(filename)
+        return filename
+
+
+def _add_sheet(workbook, export, title, frame, number_formats, progress=None, low=0.0, high=1.0):
+    """Write one worksheet, timed as an export stage, reporting progress from low to high"""
+    message = f"Writing {title} ({len(frame)} rows)"
+    on_chunk = None
+    if progress is not None:
+        progress(low, message)
+        on_chunk = lambda fraction: progress(low + (high - low) * fraction, message)
+    with span('export.write', export=export, sheet=title) as timing:
+        timing.record(rows=len(frame))
+        workbook.add_sheet(title, frame, number_formats, progress=on_chunk)
+
+
+def write_workbook(filename, sheets, export, progress=None, low=0.3):
+    """Write sheets, a list of (title, frame, number_formats), to filename and return it
+
+    Needs no Sheets access, so export worker processes run only this.
+    progress(fraction, message) moves from low to 0.95 in proportion to the
+    rows written, then reports the save; writing and saving are timed as
+    export stages.
+    """
+    workbook = StreamingWorkbook()
+    total = sum(len(frame) for _, frame, _ in sheets) or 1
+    written = 0
+    for title, frame, number_formats in sheets:
+        start = low + (0.95 - low) * written / total
+        written += len(frame)
+        _add_sheet(workbook, export, title, frame, number_formats, progress,
+                   start, low + (0.95 - low) * written / total)
+
+    if progress is not None:
+        progress(0.95, "Saving workbook")
+    with span('export.save', export=export) as timing:
+        workbook.save(filename)
+        timing.record(bytes=os.path.getsize(filename))
+    return filename
@@ -0,0 +1,299 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from . import config
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+EXPORT_KINDS = ('stock', 'sales', 'combined')
+
+logger = logging.getLogger('shop_app.export_jobs')
+
+_progress_queue = None  # Set in pool worker processes by _init_worker
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _write_export(job_id, kind, filename, sheets, progress=None):
+    """Write an export's prepared worksheets to filename in a pool worker
+
+    progress(job_id, fraction, message) defaults to the pool's queue. Workers
+    only ever get DataFrames: nothing here reads Sheets, so a worker never
+    builds a scheduler or write queue of its own.
+    """
+    from .excel_writer import write_workbook
+
+    report = progress or (lambda *update: _progress_queue.put(update))
+
+    def on_progress(fraction, message):
+        report(job_id, fraction, message)
+
+    return write_workbook(filename, sheets, kind, progress=on_progress)
+
+
+def export_window(start_date=None, end_date=None):
+    """Widen a date range to whole minutes, so repeated requests in the same minute are identical"""
+    return (
+        None if start_date is None else pd.Timestamp(start_date).floor('min').to_pydatetime(),
+        None if end_date is None else pd.Timestamp(end_date).ceil('min').to_pydatetime(),
+    )
+
+
+class ExportJob:
+    """State of one background export, updated by the runner"""
+
+    def __init__(self, key, kind, start_date, end_date):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.kind = kind
+        self.start_date = start_date
+        self.end_date = end_date
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.filename = None
+        self.size = 0
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.used_at = self.submitted_at
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+
+class ExportJobRunner:
+    """Runs Excel exports in the background and keeps the finished files
+
+    Sheets are read on a thread of this process, through its shared request
+    scheduler at bulk priority and after its queued writes are flushed. Only
+    the xlsx writing goes to worker processes, which receive the frames, so
+    it never holds the Streamlit server's GIL; progress comes back over a
+    queue. With executor='thread' the file is written on the reading thread
+    instead. A request identical to one still queued or running returns that
+    job.
+    Finished files stay in cache_dir until their total size passes
+    max_cache_bytes, when the least recently downloaded are removed along
+    with their jobs. Jobs without a file (failed, nothing to export) are
+    forgotten job_ttl_seconds after they finish.
+    """
+
+    def __init__(self, cache_dir, max_cache_bytes, max_workers=2, executor='process', job_ttl_seconds=600.0):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.max_workers = max_workers
+        self.executor = executor
+        self.job_ttl_seconds = job_ttl_seconds
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._in_flight = {}  # key -> job_id
+        self._readers = None
+        self._pool = None
+        self._queue = None
+        self._clear_cache_dir()
+
+    def submit(self, kind, start_date=None, end_date=None):
+        """Queue an export (or join the identical one in flight) and return its ExportJob"""
+        if kind not in EXPORT_KINDS:
+            raise ValueError(f"Unknown export kind: {kind}")
+        if kind != 'sales':
+            start_date = end_date = None
+        start_date, end_date = export_window(start_date, end_date)
+        key = (kind, start_date, end_date)
+
+        with self._lock:
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                return self._jobs[job_id]
+            self._prune()
+
+            job = ExportJob(key, kind, start_date, end_date)
+            output_dir = os.path.join(self.cache_dir, f'job-{job.job_id}')
+            os.makedirs(output_dir, exist_ok=True)
+            if self._readers is None:
+                self._readers = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='export')
+            future = self._readers.submit(self._run, job, output_dir)
+            self._jobs[job.job_id] = job
+            self._in_flight[key] = job.job_id
+        future.add_done_callback(lambda future: self._on_done(job, future))
+        return job
+
+    def get(self, job_id):
+        """The ExportJob with this id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Every known job, newest first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def read(self, job_id):
+        """Bytes of a finished job's file, or None if it has none or was evicted"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != DONE or job.filename is None:
+                return None
+            job.used_at = time.time()
+            filename = job.filename
+        try:
+            with open(filename, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def cached_bytes(self):
+        with self._lock:
+            return sum(job.size for job in self._jobs.values() if job.status == DONE)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            readers, self._readers = self._readers, None
+            pool, self._pool = self._pool, None
+        if readers is not None:
+            readers.shutdown(wait=wait)
+        if pool is not None:
+            pool.shutdown(wait=wait)
+        if self._queue is not None:
+            self._queue.put(None)
+
+    def _run(self, job, output_dir):
+        """Read the job's sheets in this process, then write its file (in a worker process if configured)"""
+        # Imported here: worker processes unpickle this module and must not load sheets_utils
+        from .export_utils import export_filename, prepare_export
+
+        self._on_progress(job.job_id, 0.0, "Reading sheets")
+        sheets = prepare_export(job.kind, job.start_date, job.end_date)
+        if not sheets:
+            return None
+        filename = export_filename(job.kind, output_dir)
+        if self.executor != 'process':
+            return _write_export(job.job_id, job.kind, filename, sheets, self._on_progress)
+        with self._lock:
+            pool = self._get_pool()
+        return pool.submit(_write_export, job.job_id, job.kind, filename, sheets).result()
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Spawned, not forked: the server process has threads holding locks
+            import multiprocessing
+            context = multiprocessing.get_context('spawn')
+            if self._queue is None:
+                self._queue = context.Queue()
+                threading.Thread(target=self._drain_progress, name='export-progress', daemon=True).start()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=context,
+                initializer=_init_worker, initargs=(self._queue,)
+            )
+        return self._pool
+
+    def _drain_progress(self):
+        while True:
+            update = self._queue.get()
+            if update is None:
+                return
+            self._on_progress(*update)
+
+    def _on_progress(self, job_id, fraction, message):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Updates can arrive after the result; only live jobs move
+            if job is not None and job.active:
+                job.status = RUNNING
+                job.progress = max(job.progress, min(fraction, 1.0))
+                job.message = message
+
+    def _on_done(self, job, future):
+        with self._lock:
+            self._in_flight.pop(job.key, None)
+            job.finished_at = time.time()
+            try:
+                filename = future.result()
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                job.message = "Export failed"
+                job.status = FAILED
+                shutil.rmtree(self._job_dir(job), ignore_errors=True)
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died; start a fresh pool for the next job
+                    self._pool = None
+                logger.warning("Export job %s (%s) failed: %s", job.job_id, job.kind, job.error)
+                return
+            job.used_at = job.finished_at
+            job.progress = 1.0
+            if filename is None:
+                job.message = "Nothing to export"
+                shutil.rmtree(self._job_dir(job), ignore_errors=True)
+            else:
+                job.filename = filename
+                job.size = os.path.getsize(filename)
+                job.message = "Ready"
+            self._evict(keep=job)
+            # Last, so a reader that sees DONE also sees the file and size
+            job.status = DONE
+
+    def _prune(self):
+        """Forget jobs without a file once job_ttl_seconds have passed since they finished"""
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if not job.active and job.filename is None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _evict(self, keep):
+        """Drop the least recently used files, and their jobs, until the cache fits (the newest stays)"""
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status == DONE and job.filename and job is not keep),
+            key=lambda job: job.used_at
+        )
+        total = sum(job.size for job in finished) + (keep.size if keep.filename else 0)
+        for job in finished:
+            if total <= self.max_cache_bytes:
+                break
+            shutil.rmtree(self._job_dir(job), ignore_errors=True)
+            total -= job.size
+            del self._jobs[job.job_id]
+
+    def _job_dir(self, job):
+        return os.path.join(self.cache_dir, f'job-{job.job_id}')
+
+    def _clear_cache_dir(self):
+        """Remove files left by a previous server process (only the job-* folders this runner creates)"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('job-'):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_export_runner():
+    """Return the process-wide export job runner"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = ExportJobRunner(
+                config.EXPORT_CACHE_DIR,
+                int(config.EXPORT_CACHE_MAX_MB * 1024 * 1024),
+                max_workers=config.EXPORT_JOB_WORKERS,
+                executor=config.EXPORT_JOB_EXECUTOR,
+                job_ttl_seconds=config.EXPORT_JOB_TTL_SECONDS
+            )
+    return _runner
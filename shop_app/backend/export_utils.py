@@ -1,115 +1,146 @@
-import pandas as pd
 from datetime import datetime
 import os
-from sheets_utils import read_stock_sheet, read_sales_sheet
+from .sheets_utils import read_stock_sheet, read_stock_and_sales, get_sales_index
+from .scheduler import BULK, request_priority
+from .excel_writer import write_workbook, CURRENCY_FORMAT, DATE_FORMAT, DATETIME_FORMAT
+from .metrics import span
+
+STOCK_EXPORT_COLUMNS = [
+    'Product Name', 'Date Added', 'Purchase Price',
+    'Selling Price', 'Supplier', 'Quantity', 'Product ID'
+]
+SALES_EXPORT_COLUMNS = [
+    'Date of Sale', 'Product Name', 'Product ID', 'Quantity Sold',
+    'Unit Price', 'Unit Cost', 'Total Price', 'Profit'
+]
+
+STOCK_NUMBER_FORMATS = {
+    'Date Added': DATE_FORMAT, 'Purchase Price': CURRENCY_FORMAT, 'Selling Price': CURRENCY_FORMAT
+}
+SALES_NUMBER_FORMATS = {
+    'Date of Sale': DATETIME_FORMAT, 'Unit Price': CURRENCY_FORMAT, 'Unit Cost': CURRENCY_FORMAT,
+    'Total Price': CURRENCY_FORMAT, 'Profit': CURRENCY_FORMAT
+}
+EXPORT_FILE_PREFIXES = {'stock': 'stock_data', 'sales': 'sales_data', 'combined': 'shop_data'}
+
+def _report(progress, fraction, message):
+    """Pass a progress update on to the caller's progress(fraction, message), if any"""
+    if progress is not None:
+        progress(fraction, message)
+
+def _stock_export_frame(stock_df):
+    """Stock columns in export order (already typed by the sheet codec)"""
+    return stock_df[STOCK_EXPORT_COLUMNS]
+
+def _sales_export_frame(sales_df, stock_df):
+    """Sales columns with profit from each sale's recorded cost basis
+
+    Rows written before the cost basis was recorded fall back to current stock.
+    """
+    stock = stock_df.drop_duplicates('Product ID').set_index('Product ID')
+    product_ids = sales_df['Product ID']
+    names = sales_df['Product Name'].where(sales_df['Product Name'] != '', product_ids.map(stock['Product Name']))
+    unit_cost = sales_df['Unit Cost'].fillna(product_ids.map(stock['Purchase Price']))
+    return sales_df.assign(**{
+        'Product Name': names,
+        'Unit Price': sales_df['Unit Price'].fillna(product_ids.map(stock['Selling Price'])),
+        'Unit Cost': unit_cost,
+        'Profit': sales_df['Total Price'] - unit_cost.fillna(0) * sales_df['Quantity Sold'],
+    })[SALES_EXPORT_COLUMNS]
+
+def _combined_sheets(stock_df, sales_df):
+    """Stock and Sales worksheets of the combined export, skipping empty ones"""
+    sheets = []
+    if not stock_df.empty:
+        sheets.append(('Stock', _stock_export_frame(stock_df), STOCK_NUMBER_FORMATS))
+    if not sales_df.empty:
+        with span('export.prepare', export='combined') as timing:
+            export_df = _sales_export_frame(sales_df, stock_df)
+            timing.record(rows=len(export_df))
+        sheets.append(('Sales', export_df, SALES_NUMBER_FORMATS))
+    return sheets
+
+def export_filename(kind, output_dir="."):
+    """Path of today's xlsx file for an export kind"""
+    return os.path.join(output_dir, f'{EXPORT_FILE_PREFIXES[kind]}_{datetime.now().strftime("%Y%m%d")}.xlsx')
+
+def prepare_stock_export():
+    """Read the Stock sheet and return its worksheets for write_workbook ([] if empty)"""
+    # Exports yield to interactive Sheets traffic
+    with request_priority(BULK), span('export.read', export='stock') as timing:
+        stock_df = read_stock_sheet()
+        timing.record(rows=len(stock_df))
 
-def export_stock_data(output_dir="."):
-    """Export stock data to Excel"""
-    stock_df = read_stock_sheet()
-    
     if stock_df.empty:
+        return []
+    return [('Stock', _stock_export_frame(stock_df), STOCK_NUMBER_FORMATS)]
+
+def prepare_sales_export(start_date=None, end_date=None):
+    """Read and filter the sales and return their worksheets for write_workbook ([] if none)"""
+    # One batched round-trip for both sheets, behind interactive Sheets traffic
+    with request_priority(BULK), span('export.read', export='sales') as timing:
+        stock_df, sales_df = read_stock_and_sales()
+        timing.record(rows=len(stock_df) + len(sales_df))
+
+    if sales_df.empty:
+        return []
+
+    with span('export.prepare', export='sales') as timing:
+        # Date-ordered index with parsed dates, reused until the sheet changes
+        sales_index = get_sales_index(sales_df)
+
+        # Apply date filtering if specified
+        if start_date and end_date:
+            sales_df = sales_index.window(start_date, end_date)
+        else:
+            sales_df = sales_index.frame
+        export_df = _sales_export_frame(sales_df, stock_df)
+        timing.record(rows=len(export_df))
+    return [('Sales', export_df, SALES_NUMBER_FORMATS)]
+
+def prepare_combined_export():
+    """Read both sheets in one batched request and return the combined worksheets ([] if empty)"""
+    with request_priority(BULK), span('export.read', export='combined') as timing:
+        stock_df, sales_df = read_stock_and_sales()
+        timing.record(rows=len(stock_df) + len(sales_df))
+    return _combined_sheets(stock_df, sales_df)
+
+def prepare_export(kind, start_date=None, end_date=None):
+    """Read and shape the worksheets of one export kind ('stock', 'sales' or 'combined')
+
+    All Sheets access of an export happens here, in the calling process, so
+    it shares that process's request scheduler; write_workbook then only
+    needs the returned frames.
+    """
+    if kind == 'stock':
+        return prepare_stock_export()
+    if kind == 'sales':
+        return prepare_sales_export(start_date, end_date)
+    return prepare_combined_export()
+
+def export_stock_data(output_dir=".", progress=None):
+    """Export stock data to Excel
+
+    progress(fraction, message), if given, is called as each stage advances.
+    """
+    _report(progress, 0.0, "Reading Stock sheet")
+    sheets = prepare_stock_export()
+    if not sheets:
         return None
-        
-    # Format the display columns
-    display_df = stock_df[[
-        'Product Name', 'Date Added', 'Purchase Price', 
-        'Selling Price', 'Supplier', 'Quantity', 'Product ID'
-    ]].copy()
-    
-    # Convert numeric columns
-    display_df['Purchase Price'] = pd.to_numeric(display_df['Purchase Price'])
-    display_df['Selling Price'] = pd.to_numeric(display_df['Selling Price'])
-    display_df['Quantity'] = pd.to_numeric(display_df['Quantity'])
-    
-    # Format currency columns
-    display_df['Purchase Price'] = display_df['Purchase Price'].apply(lambda x: f"${x:.2f}")
-    display_df['Selling Price'] = display_df['Selling Price'].apply(lambda x: f"${x:.2f}")
-    
-    filename = os.path.join(output_dir, f'stock_data_{datetime.now().strftime("%Y%m%d")}.xlsx')
-    display_df.to_excel(filename, sheet_name='Stock', index=False)
-    
-    return filename
-
-def export_sales_data(output_dir=".", start_date=None, end_date=None):
+    return write_workbook(export_filename('stock', output_dir), sheets, 'stock', progress)
+
+def export_sales_data(output_dir=".", start_date=None, end_date=None, progress=None):
     """Export sales data to Excel with optional date filtering"""
-    sales_df = read_sales_sheet()
-    stock_df = read_stock_sheet()
-    
-    if sales_df.empty:
+    _report(progress, 0.0, "Reading Stock and Sales sheets")
+    sheets = prepare_sales_export(start_date, end_date)
+    if not sheets:
         return None
-        
-    # Convert date column to datetime
-    sales_df['Date of Sale'] = pd.to_datetime(sales_df['Date of Sale'])
-    
-    # Apply date filtering if specified
-    if start_date and end_date:
-        sales_df = sales_df[
-            (sales_df['Date of Sale'] >= start_date) & 
-            (sales_df['Date of Sale'] <= end_date)
-        ]
-    
-    # Merge with stock data to get product names
-    merged_df = sales_df.merge(
-        stock_df[['Product ID', 'Product Name']],
-        on='Product ID',
-        how='left'
-    )
-    
-    # Format the display columns
-    display_df = merged_df[[
-        'Date of Sale', 'Product Name', 'Product ID',
-        'Quantity Sold', 'Total Price'
-    ]].copy()
-    
-    # Convert numeric columns
-    display_df['Total Price'] = pd.to_numeric(display_df['Total Price'])
-    display_df['Quantity Sold'] = pd.to_numeric(display_df['Quantity Sold'])
-    
-    # Format date and currency
-    display_df['Date of Sale'] = display_df['Date of Sale'].dt.strftime('%Y-%m-%d %H:%M')
-    display_df['Total Price'] = display_df['Total Price'].apply(lambda x: f"${x:.2f}")
-    
-    filename = os.path.join(output_dir, f'sales_data_{datetime.now().strftime("%Y%m%d")}.xlsx')
-    display_df.to_excel(filename, sheet_name='Sales', index=False)
-    
-    return filename
-
-def export_combined_data(output_dir="."):
+    return write_workbook(export_filename('sales', output_dir), sheets, 'sales', progress)
+
+def export_combined_data(output_dir=".", progress=None):
     """Export both stock and sales data to a single Excel file with multiple sheets"""
-    filename = os.path.join(output_dir, f'shop_data_{datetime.now().strftime("%Y%m%d")}.xlsx')
-    
-    # Create Excel writer object
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-        # Export stock data
-        stock_df = read_stock_sheet()
-        if not stock_df.empty:
-            # Format stock data
-            stock_df['Purchase Price'] = pd.to_numeric(stock_df['Purchase Price'])
-            stock_df['Selling Price'] = pd.to_numeric(stock_df['Selling Price'])
-            stock_df['Quantity'] = pd.to_numeric(stock_df['Quantity'])
-            
-            stock_df['Purchase Price'] = stock_df['Purchase Price'].apply(lambda x: f"${x:.2f}")
-            stock_df['Selling Price'] = stock_df['Selling Price'].apply(lambda x: f"${x:.2f}")
-            
-            stock_df.to_excel(writer, sheet_name='Stock', index=False)
-        
-        # Export sales data
-        sales_df = read_sales_sheet()
-        if not sales_df.empty:
-            # Merge with stock data
-            merged_df = sales_df.merge(
-                stock_df[['Product ID', 'Product Name']],
-                on='Product ID',
-                how='left'
-            )
-            
-            # Format sales data
-            merged_df['Date of Sale'] = pd.to_datetime(merged_df['Date of Sale'])
-            merged_df['Total Price'] = pd.to_numeric(merged_df['Total Price'])
-            
-            merged_df['Date of Sale'] = merged_df['Date of Sale'].dt.strftime('%Y-%m-%d %H:%M')
-            merged_df['Total Price'] = merged_df['Total Price'].apply(lambda x: f"${x:.2f}")
-            
-            merged_df.to_excel(writer, sheet_name='Sales', index=False)
-    
-    return filename
\ No newline at end of file
+    _report(progress, 0.0, "Reading Stock and Sales sheets")
+    sheets = prepare_combined_export()
+    if not sheets:
+        return None
+    return write_workbook(export_filename('combined', output_dir), sheets, 'combined', progress)
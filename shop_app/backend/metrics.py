@@ -0,0 +1,281 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import config
+
+# Upper bounds (seconds) of the span duration buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger('shop_app.metrics')
+
+_request = contextvars.ContextVar('metrics_request', default=None)
+_parent = contextvars.ContextVar('metrics_parent_span', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, count of observations <= bound) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class _Series:
+    __slots__ = ('seconds', 'rows', 'bytes', 'errors')
+
+    def __init__(self):
+        self.seconds = Histogram()
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+
+
+class MetricsRegistry:
+    """Span durations, row and byte totals per (span name, labels)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, span):
+        key = (span.name, tuple(sorted(span.labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.seconds.observe(span.seconds)
+            series.rows += span.rows or 0
+            series.bytes += span.bytes or 0
+            series.errors += span.error is not None
+
+    def snapshot(self):
+        """{(name, labels): {'count', 'seconds_total', 'rows', 'bytes', 'errors'}}"""
+        with self._lock:
+            return {
+                key: {'count': series.seconds.count, 'seconds_total': series.seconds.sum,
+                      'rows': series.rows, 'bytes': series.bytes, 'errors': series.errors}
+                for key, series in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def to_prometheus(self):
+        """Every series in the Prometheus text exposition format"""
+        lines = [
+            '# HELP shop_span_seconds Duration of instrumented operations',
+            '# TYPE shop_span_seconds histogram',
+        ]
+        totals = {'rows': [], 'bytes': [], 'errors': []}
+        with self._lock:
+            for (name, labels), series in sorted(self._series.items()):
+                label_text = _labels({'span': name, **dict(labels)})
+                for bound, count in series.seconds.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'shop_span_seconds_bucket{_labels({"span": name, **dict(labels), "le": le})} {count}')
+                lines.append(f'shop_span_seconds_sum{label_text} {series.seconds.sum}')
+                lines.append(f'shop_span_seconds_count{label_text} {series.seconds.count}')
+                totals['rows'].append(f'shop_span_rows_total{label_text} {series.rows}')
+                totals['bytes'].append(f'shop_span_bytes_total{label_text} {series.bytes}')
+                totals['errors'].append(f'shop_span_errors_total{label_text} {series.errors}')
+        for kind, help_text in (('rows', 'Rows handled'), ('bytes', 'Bytes handled'), ('errors', 'Failed operations')):
+            lines.append(f'# HELP shop_span_{kind}_total {help_text} by instrumented operations')
+            lines.append(f'# TYPE shop_span_{kind}_total counter')
+            lines.extend(totals[kind])
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Span:
+    """One timed operation; rows and bytes are set by the code being timed"""
+
+    __slots__ = ('name', 'labels', 'rows', 'bytes', 'seconds', 'error', 'depth')
+
+    def __init__(self, name, labels, depth):
+        self.name = name
+        self.labels = labels
+        self.rows = None
+        self.bytes = None
+        self.seconds = 0.0
+        self.error = None
+        self.depth = depth
+
+    def record(self, rows=None, bytes=None):
+        """Add to the span's row and byte counts"""
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+        if bytes is not None:
+            self.bytes = (self.bytes or 0) + bytes
+
+
+class RequestContext:
+    """Identity of one page run; trace=True logs every span it makes, not only slow ones"""
+
+    def __init__(self, name, trace=False):
+        self.name = name
+        self.trace = trace
+        self.request_id = uuid.uuid4().hex[:12]
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    """Return the process-wide metrics registry"""
+    return _registry
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the block, feed the span histograms and log it if slow or traced
+
+    labels must be low-cardinality (a lane, an export kind); per-call
+    quantities go through span.record(rows=..., bytes=...).
+    """
+    parent = _parent.get()
+    current = Span(name, labels, 0 if parent is None else parent.depth + 1)
+    token = _parent.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.seconds = time.perf_counter() - started
+        _parent.reset(token)
+        _registry.observe(current)
+        _log(current)
+
+
+def begin_request(name, trace=False):
+    """Start a page run: spans made on this thread from now on belong to it
+
+    Streamlit runs each page script top to bottom on one thread (and may stop
+    it anywhere), so the request is set for the rest of the run rather than
+    scoped to a block. Also starts the metrics endpoint if one is configured.
+    """
+    _ensure_logging()
+    if config.METRICS_PORT:
+        start_metrics_server(config.METRICS_PORT)
+    request = RequestContext(name, trace or config.METRICS_TRACE_ALL)
+    _request.set(request)
+    _parent.set(None)
+    return request
+
+
+def current_request():
+    """RequestContext of the page run in progress, or None"""
+    return _request.get()
+
+
+def _log(current):
+    request = _request.get()
+    traced = request is not None and request.trace
+    slow = current.seconds * 1000 >= config.METRICS_SLOW_SPAN_MS
+    if not (traced or slow or logger.isEnabledFor(logging.DEBUG)):
+        return
+    record = {
+        'span': current.name,
+        'ms': round(current.seconds * 1000, 3),
+        'depth': current.depth,
+        **current.labels,
+    }
+    if current.rows is not None:
+        record['rows'] = current.rows
+    if current.bytes is not None:
+        record['bytes'] = current.bytes
+    if current.error is not None:
+        record['error'] = current.error
+    if request is not None:
+        record['request'] = request.request_id
+        record['page'] = request.name
+    level = logging.WARNING if slow else logging.INFO if traced else logging.DEBUG
+    logger.log(level, json.dumps(record, default=str))
+
+
+_logging_lock = threading.Lock()
+_logging_ready = False
+
+
+def _ensure_logging():
+    """Attach the JSON-lines file handler once per process, if configured"""
+    global _logging_ready
+    if _logging_ready:
+        return
+    with _logging_lock:
+        if _logging_ready:
+            return
+        if config.METRICS_LOG_PATH:
+            os.makedirs(os.path.dirname(os.path.abspath(config.METRICS_LOG_PATH)), exist_ok=True)
+            handler = logging.FileHandler(config.METRICS_LOG_PATH)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        _logging_ready = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = _registry.to_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a log line each
+
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """Serve /metrics in Prometheus text format from a daemon thread (once per process)"""
+    global _server, _server_started
+    with _server_lock:
+        if not _server_started:
+            # Only tried once: another process may already own the port
+            _server_started = True
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning(f"Metrics endpoint not started on port {port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    return _server
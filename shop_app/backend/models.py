@@ -15,4 +15,8 @@ class SaleRecord(BaseModel):
     product_id: str
     date_of_sale: datetime = Field(default_factory=datetime.now)
     quantity_sold: int
-    total_price: float
\ No newline at end of file
+    total_price: float
+    # Cost basis captured from the stock item when the sale is recorded
+    product_name: Optional[str] = None
+    unit_price: Optional[float] = None
+    unit_cost: Optional[float] = None
\ No newline at end of file
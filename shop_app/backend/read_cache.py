@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def freeze_frame(df):
+    """Return a DataFrame whose column arrays are read-only
+
+    Cached frames are shared by every caller, so in-place edits raise instead
+    of silently changing what the next caller sees. Use .assign() or .copy()
+    to derive a modified frame.
+    """
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        # Arrays that are already read-only (another frozen frame, a ColumnStore view) are shared as-is
+        if values.flags.writeable:
+            values = values.copy()
+            values.setflags(write=False)
+        columns[name] = values
+    # copy=False keeps one block per column so the read-only arrays are used as-is
+    frozen = pd.DataFrame(columns, index=df.index, columns=df.columns, copy=False)
+    frozen.attrs['read_only'] = True
+    return frozen
+
+
+class _Entry:
+    __slots__ = ('value', 'token', 'loaded_at', 'checked_at')
+
+    def __init__(self, value, token, now):
+        self.value = value
+        self.token = token
+        self.loaded_at = now
+        self.checked_at = now
+
+
+class ReadThroughCache:
+    """LRU cache of sheet frames with TTL and a cheap revision probe
+
+    Within ttl_seconds a cached frame is returned without touching the network.
+    After that, the optional probe (a small request returning a revision token
+    such as the row count) decides whether the full download is needed. Probes
+    cannot see every edit made by other writers, so entries are reloaded
+    unconditionally once they are older than max_stale_seconds. version
+    counts the changes callers can see: loads that returned a new value and
+    invalidations.
+    """
+
+    def __init__(self, ttl_seconds=30.0, max_stale_seconds=300.0, max_entries=16):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._generation = 0
+        self._version = 0
+        self._stats = {'hits': 0, 'revalidations': 0, 'loads': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, loader, probe=None):
+        """Return the cached value for key, loading it with loader() if needed"""
+        # One loader per key at a time; concurrent callers wait and share the result
+        with self._key_lock(key):
+            now = time.time()
+            with self._lock:
+                generation = self._generation
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    if now - entry.checked_at < self.ttl_seconds:
+                        self._stats['hits'] += 1
+                        return entry.value
+
+            token = probe() if probe is not None else None
+            if (entry is not None and token is not None and token == entry.token
+                    and now - entry.loaded_at < self.max_stale_seconds):
+                with self._lock:
+                    entry.checked_at = now
+                    self._stats['revalidations'] += 1
+                return entry.value
+
+            value = loader()
+            with self._lock:
+                if generation != self._generation:
+                    # Invalidated while loading; the value may predate our own write
+                    return value
+                if entry is None or entry.value is not value:
+                    self._version += 1
+                self._entries[key] = _Entry(value, token, now)
+                self._entries.move_to_end(key)
+                self._stats['loads'] += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+            return value
+
+    def get_many(self, keys, loader):
+        """Return values for several keys, loading all misses with one loader(missing) call
+
+        loader receives the list of missing keys and returns a dict of values.
+        Expired entries are treated as misses rather than probed, since a single
+        combined download is no more expensive than the probes would be.
+        """
+        locks = [self._key_lock(key) for key in sorted(set(keys))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            now = time.time()
+            found = {}
+            with self._lock:
+                generation = self._generation
+                for key in keys:
+                    entry = self._entries.get(key)
+                    if entry is not None and now - entry.checked_at < self.ttl_seconds:
+                        self._entries.move_to_end(key)
+                        self._stats['hits'] += 1
+                        found[key] = entry.value
+            missing = [key for key in keys if key not in found]
+            if missing:
+                loaded = loader(missing)
+                found.update(loaded)
+                with self._lock:
+                    if generation == self._generation:
+                        for key in missing:
+                            previous = self._entries.get(key)
+                            if previous is None or previous.value is not loaded[key]:
+                                self._version += 1
+                            self._entries[key] = _Entry(loaded[key], None, now)
+                            self._entries.move_to_end(key)
+                            self._stats['loads'] += 1
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                            self._stats['evictions'] += 1
+            return [found[key] for key in keys]
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @property
+    def version(self):
+        """Monotonic counter that changes whenever a cached value may have changed"""
+        with self._lock:
+            return self._version
+
+    def is_fresh(self, keys):
+        """True if every key is cached and was checked within ttl_seconds"""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or now - entry.checked_at >= self.ttl_seconds:
+                    return False
+        return True
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._generation += 1
+            self._version += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
@@ -0,0 +1,381 @@
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import pandas as pd
+
+from . import config
+from .aggregates import SalesAggregates
+from .catalog import StockCatalog
+from .columnar import ColumnStore, FLOAT, INT, TIMESTAMP, INTERNED
+from .models import StockItem
+from .read_cache import freeze_frame
+from .sales_index import SalesTimeIndex
+
+STOCK_FIELDS = [
+    'product_id', 'product_name', 'date_added', 'purchase_price',
+    'selling_price', 'supplier', 'quantity'
+]
+SALE_FIELDS = [
+    'product_id', 'date_of_sale', 'quantity_sold', 'total_price',
+    'product_name', 'unit_price', 'unit_cost'
+]
+
+STOCK_DTYPES = {
+    'product_id': 'object', 'product_name': 'object', 'date_added': 'datetime64[ns]',
+    'purchase_price': 'float64', 'selling_price': 'float64', 'supplier': 'object', 'quantity': 'int64'
+}
+SALE_DTYPES = {
+    'product_id': 'object', 'date_of_sale': 'datetime64[ns]', 'quantity_sold': 'int64', 'total_price': 'float64',
+    'product_name': 'object', 'unit_price': 'float64', 'unit_cost': 'float64'
+}
+
+
+# A consistent view of the data: both frames belong to version
+Snapshot = namedtuple('Snapshot', ['version', 'stock', 'sales'])
+
+# Storage kinds for the in-memory sales columns; IDs and names repeat, so they are interned
+SALE_COLUMN_KINDS = {
+    'product_id': INTERNED, 'date_of_sale': TIMESTAMP, 'quantity_sold': INT, 'total_price': FLOAT,
+    'product_name': INTERNED, 'unit_price': FLOAT, 'unit_cost': FLOAT
+}
+
+
+def model_values(model, fields):
+    """Field values of a StockItem/SaleRecord as a plain dict"""
+    return {field: getattr(model, field) for field in fields}
+
+
+def typed_frame(rows, fields, dtypes):
+    """Build a read-only frame with a fixed column order and dtypes (also when empty)"""
+    if isinstance(rows, pd.DataFrame) and list(rows.columns) == fields:
+        frame = rows
+    else:
+        frame = pd.DataFrame(rows, columns=fields)
+    # copy=False: columns that already have the right dtype (e.g. ColumnStore views) are not copied
+    return freeze_frame(frame.astype({field: dtypes[field] for field in fields}, copy=False))
+
+
+def sale_frame(sale):
+    """One SaleRecord as a typed one-row SALE_FIELDS frame"""
+    return typed_frame([model_values(sale, SALE_FIELDS)], SALE_FIELDS, SALE_DTYPES)
+
+
+def sales_profit(sales_df):
+    """Profit of each sale from its own cost basis (no stock join)"""
+    return sales_df['total_price'] - sales_df['unit_cost'].fillna(0) * sales_df['quantity_sold']
+
+
+def with_cost_basis(sales_df, stock_frame):
+    """Fill in cost basis for sales recorded before it was stored, from current stock
+
+    stock_frame is only called if some sale is missing its cost basis.
+    """
+    missing = sales_df['unit_cost'].isna() | sales_df['product_name'].isna()
+    if not missing.any():
+        return sales_df
+    stock = stock_frame().drop_duplicates('product_id').set_index('product_id')
+    product_ids = sales_df['product_id']
+    return freeze_frame(sales_df.assign(
+        product_name=sales_df['product_name'].fillna(product_ids.map(stock['product_name'])),
+        unit_price=sales_df['unit_price'].fillna(product_ids.map(stock['selling_price'])),
+        unit_cost=sales_df['unit_cost'].fillna(product_ids.map(stock['purchase_price']))
+    ))
+
+
+class ShopRepository(ABC):
+    """Storage interface for stock items and sales
+
+    Backends implement the abstract methods below; the pages only talk to
+    this interface. Frames are built once per data version and shared, so
+    they are read-only: derive new frames with .assign() or .copy().
+    """
+
+    # False for backends whose data cannot be replaced from a CSV upload
+    supports_import = True
+
+    def __init__(self):
+        self._frames = {}
+        self._frames_lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def version(self):
+        """Changes whenever stock or sales data changes"""
+
+    def snapshot(self):
+        """Snapshot of the current stock and sales frames
+
+        Frames are shared per version, so this is two cache hits unless the
+        data changed; it retries if a write lands between the two reads.
+        """
+        while True:
+            version = self.version
+            stock, sales = self.stock_frame(), self.sales_frame()
+            if self.version == version:
+                return Snapshot(version, stock, sales)
+
+    def stock_frame(self):
+        """All stock items as a typed DataFrame with STOCK_FIELDS columns"""
+        return self._cached('stock', self._load_stock_frame)
+
+    def sales_frame(self, start=None, end=None):
+        """Sales with date_of_sale between start and end (inclusive, either optional)"""
+        if start is None and end is None:
+            return self._cached('sales', lambda: with_cost_basis(self._load_sales_frame(), self.stock_frame))
+        return self.sales_index().window(start, end)
+
+    def sales_index(self):
+        """SalesTimeIndex over all sales, for binary-search date windows"""
+        return self._cached('sales_index', lambda: SalesTimeIndex(self.sales_frame()))
+
+    def recent_sales(self, n=5):
+        """The n latest sales, newest first"""
+        # The date-ordered index is carried over our own sales, so this is a slice, not a reload
+        frame = self.sales_index().frame
+        return frame.iloc[max(len(frame) - n, 0):].iloc[::-1]
+
+    def catalog(self):
+        """StockCatalog for O(1) product lookups, rebuilt only when the data version changes"""
+        return self._cached('catalog', lambda: StockCatalog.from_frame(self.stock_frame()))
+
+    def aggregates(self):
+        """SalesAggregates for dashboard metrics, kept current by our own sales"""
+        return self._cached('aggregates', lambda: SalesAggregates.from_frame(self.sales_frame()))
+
+    @abstractmethod
+    def get_stock(self, product_id):
+        """Return the StockItem for product_id, or None"""
+
+    @abstractmethod
+    def add_stock(self, item):
+        """Store a new StockItem and return it"""
+
+    @abstractmethod
+    def set_quantity(self, product_id, quantity):
+        """Overwrite the stock quantity of a product"""
+
+    @abstractmethod
+    def record_sale(self, sale):
+        """Store a SaleRecord and take the sold quantity out of stock
+
+        Raises ValueError if the product is unknown or has too little stock.
+        """
+
+    @abstractmethod
+    def import_stock(self, chunks):
+        """Replace all stock with the rows of an iterable of typed STOCK_FIELDS frames
+
+        Used by the streaming CSV import; chunks are consumed one at a time
+        and the old data stays visible until the last chunk has been stored.
+        If the chunks hold no rows at all, the current data is kept.
+        """
+
+    @abstractmethod
+    def import_sales(self, chunks):
+        """Replace all sales with the rows of an iterable of typed SALE_FIELDS frames (kept if there are none)"""
+
+    @abstractmethod
+    def _load_stock_frame(self):
+        """Read all stock items as a typed frame with STOCK_FIELDS columns"""
+
+    @abstractmethod
+    def _load_sales_frame(self):
+        """Read all sales as a typed frame with SALE_FIELDS columns"""
+
+    def _cached(self, name, loader):
+        version = self.version
+        with self._frames_lock:
+            cached = self._frames.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        frame = loader()
+        with self._frames_lock:
+            self._frames[name] = (version, frame)
+        return frame
+
+    def _patch_cached(self, before_version, **updates):
+        """Apply our own write to cached derived structures instead of rebuilding them
+
+        Each keyword names a cached structure and gives the function that
+        applies the write to it (None if the write does not affect it).
+        Structures cached at before_version are updated and carried over to
+        the current version; anything else is left to be rebuilt on next use.
+        """
+        with self._frames_lock:
+            version = self.version
+            for name, update in updates.items():
+                cached = self._frames.get(name)
+                if cached is None or cached[0] != before_version:
+                    continue
+                if update is not None:
+                    update(cached[1])
+                self._frames[name] = (version, cached[1])
+
+    def _replace_cached(self, before_version, **replacements):
+        """Carry read-only cached structures (frames, indexes) over our own write
+
+        Like _patch_cached, but each function returns the structure's
+        replacement instead of changing it in place.
+        """
+        with self._frames_lock:
+            version = self.version
+            for name, replace in replacements.items():
+                cached = self._frames.get(name)
+                if cached is not None and cached[0] == before_version:
+                    self._frames[name] = (version, replace(cached[1]))
+
+    def _append_cached_sale(self, before_version, row):
+        """Add our own sale (a one-row SALE_FIELDS frame) to the cached sales frame and index"""
+        self._replace_cached(
+            before_version,
+            sales=lambda sales: freeze_frame(pd.concat([sales, row], ignore_index=True)),
+            sales_index=lambda index: index.extended(row)
+        )
+
+
+def ensure_product_id(item):
+    """Give a new StockItem a unique Product ID if it has none"""
+    if not item.product_id:
+        item.product_id = str(uuid.uuid4())
+    return item
+
+
+def check_sale(item, sale):
+    """Validate a sale against the current stock item"""
+    if item is None:
+        raise ValueError(f"Product ID {sale.product_id} not found")
+    if sale.quantity_sold > item.quantity:
+        raise ValueError(f"Only {item.quantity} units of {item.product_name} in stock")
+
+
+def capture_cost_basis(item, sale):
+    """Copy name, price and cost from the stock item onto the sale, unless already set"""
+    # Later price changes must not rewrite the profit of past sales
+    if sale.product_name is None:
+        sale.product_name = item.product_name
+    if sale.unit_price is None:
+        sale.unit_price = item.selling_price
+    if sale.unit_cost is None:
+        sale.unit_cost = item.purchase_price
+
+
+class MemoryRepository(ShopRepository):
+    """Keeps stock and sales in process memory
+
+    Stock lives directly in a StockCatalog, so sales decrement quantities in
+    place and the record_sale page never rebuilds its product index. Sales
+    live in a ColumnStore of typed arrays, so a sale costs a few dozen bytes
+    and the sales frame is a set of views rather than a conversion.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._catalog = StockCatalog()
+        self._sales = ColumnStore(SALE_COLUMN_KINDS)
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def catalog(self):
+        return self._catalog
+
+    def get_stock(self, product_id):
+        return self._catalog.get(product_id)
+
+    def add_stock(self, item):
+        ensure_product_id(item)
+        with self._lock:
+            before = self._version
+            self._catalog.add(item)
+            self._version += 1
+            self._patch_cached(
+                before,
+                aggregates=lambda aggregates: aggregates.set_product_name(item.product_id, item.product_name)
+            )
+        return item
+
+    def set_quantity(self, product_id, quantity):
+        with self._lock:
+            before = self._version
+            self._catalog.set_quantity(product_id, quantity)
+            self._version += 1
+            self._patch_cached(before, aggregates=None)
+
+    def record_sale(self, sale):
+        with self._lock:
+            item = self._catalog.get(sale.product_id)
+            check_sale(item, sale)
+            capture_cost_basis(item, sale)
+            before = self._version
+            self._catalog.decrement(sale.product_id, sale.quantity_sold)
+            self._sales.append(model_values(sale, SALE_FIELDS))
+            self._version += 1
+            self._patch_cached(
+                before,
+                aggregates=lambda aggregates: aggregates.add_sale(sale)
+            )
+            self._append_cached_sale(before, sale_frame(sale))
+        return sale
+
+    def import_stock(self, chunks):
+        # Built one chunk at a time; a later row replaces an earlier one with the same Product ID
+        catalog = StockCatalog()
+        for chunk in chunks:
+            for record in chunk.to_dict('records'):
+                catalog.put(StockItem(**record))
+        if not len(catalog):
+            return  # Nothing valid to import; keep the current stock
+        with self._lock:
+            self._catalog = catalog
+            self._version += 1
+
+    def import_sales(self, chunks):
+        sales = ColumnStore(SALE_COLUMN_KINDS)
+        for chunk in chunks:
+            sales.extend(chunk)
+        if not len(sales):
+            return  # Nothing valid to import; keep the current sales
+        with self._lock:
+            self._sales = sales
+            self._version += 1
+
+    def _load_stock_frame(self):
+        with self._lock:
+            rows = [model_values(item, STOCK_FIELDS) for item in self._catalog.items()]
+        return typed_frame(rows, STOCK_FIELDS, STOCK_DTYPES)
+
+    def _load_sales_frame(self):
+        with self._lock:
+            frame = self._sales.to_frame()
+        return typed_frame(frame, SALE_FIELDS, SALE_DTYPES)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def create_repository(backend=None):
+    """Return the process-wide repository for the configured STORAGE_BACKEND
+
+    Every backend is shared by all sessions of the server process, so each
+    session sees the others' changes and memory does not grow per session.
+    """
+    backend = backend or config.STORAGE_BACKEND
+    with _shared_lock:
+        if backend not in _shared:
+            if backend == 'memory':
+                _shared[backend] = MemoryRepository()
+            elif backend == 'sqlite':
+                from .sqlite_repository import SQLiteRepository
+                _shared[backend] = SQLiteRepository(config.SQLITE_PATH)
+            elif backend == 'sheets':
+                from .sheets_repository import SheetsRepository
+                _shared[backend] = SheetsRepository()
+            else:
+                raise ValueError(f"Unknown storage backend: {backend}")
+        return _shared[backend]
@@ -0,0 +1,75 @@
+import re
+import threading
+
+_RANGE_START_ROW = re.compile(r'![A-Z]+(\d+)')
+
+
+class ProductRowIndex:
+    """Maintained product_id -> sheet row number map for one sheet
+
+    The index is built from the Product ID column alone and kept current as
+    we append rows. Before a row number is trusted it is checked with a
+    single-cell read; if that cell no longer holds the product (rows were
+    inserted, deleted or sorted by someone else) the index is rebuilt.
+    """
+
+    def __init__(self, fetch_ids, probe_id, first_row=2):
+        # fetch_ids() -> list of IDs starting at first_row; probe_id(row) -> ID at row
+        self._fetch_ids = fetch_ids
+        self._probe_id = probe_id
+        self._first_row = first_row
+        self._lock = threading.Lock()
+        self._rows = None
+        self._stats = {'builds': 0, 'lookups': 0, 'stale': 0}
+
+    def find_row(self, product_id):
+        """Return the verified sheet row holding product_id, or None"""
+        with self._lock:
+            self._stats['lookups'] += 1
+            rebuilt = False
+            if self._rows is None:
+                self._rebuild()
+                rebuilt = True
+
+            row = self._rows.get(product_id)
+            if row is not None and self._probe_id(row) == product_id:
+                return row
+            if rebuilt:
+                return None
+
+            # Missing or moved: the sheet changed under us
+            self._stats['stale'] += 1
+            self._rebuild()
+            return self._rows.get(product_id)
+
+    def record_append(self, product_ids, updated_range):
+        """Register rows we just appended, given the API's updatedRange"""
+        match = _RANGE_START_ROW.search(updated_range or '')
+        with self._lock:
+            if self._rows is None:
+                return
+            if match is None:
+                self._rows = None
+                return
+            start = int(match.group(1))
+            for offset, product_id in enumerate(product_ids):
+                self._rows[product_id] = start + offset
+
+    def invalidate(self):
+        """Forget the index; it is rebuilt on the next lookup"""
+        with self._lock:
+            self._rows = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._rows) if self._rows is not None else 0
+        return stats
+
+    def _rebuild(self):
+        rows = {}
+        for offset, product_id in enumerate(self._fetch_ids()):
+            if product_id and product_id not in rows:
+                rows[product_id] = self._first_row + offset
+        self._rows = rows
+        self._stats['builds'] += 1
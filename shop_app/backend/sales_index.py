@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+
+class SalesTimeIndex:
+    """Sales kept in date order with pre-parsed datetime64 keys
+
+    Built once per data version. A date window is two binary searches over
+    the sorted keys plus a positional slice of the sorted frame, so filtering
+    costs O(log n) plus the size of the result instead of a full-column mask.
+    """
+
+    def __init__(self, frame, time_column='date_of_sale'):
+        times = frame[time_column]
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            times = pd.to_datetime(times, errors='coerce')
+            frame = frame.assign(**{time_column: times})
+
+        keys = times.to_numpy(dtype='datetime64[ns]')
+        # Sales arrive in time order, so this is normally a single O(n) check
+        if len(keys) and not (keys[1:] >= keys[:-1]).all():
+            order = np.argsort(keys, kind='stable')
+            frame = frame.take(order)
+            keys = keys[order]
+
+        self.time_column = time_column
+        if not isinstance(frame.index, pd.RangeIndex) or frame.index.start != 0:
+            frame = frame.reset_index(drop=True)
+        self._frame = frame
+        self._keys = keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def frame(self):
+        """The whole frame in date order"""
+        return self._frame
+
+    def extended(self, rows):
+        """A new index with rows (same columns) added; re-sorted only if they are older than the last sale"""
+        return SalesTimeIndex(pd.concat([self._frame, rows], ignore_index=True), self.time_column)
+
+    def first(self):
+        return pd.Timestamp(self._keys[0]) if len(self._keys) else None
+
+    def last(self):
+        return pd.Timestamp(self._keys[-1]) if len(self._keys) else None
+
+    def bounds(self, start=None, end=None):
+        """Positions [lo, hi) of the rows with start <= date <= end"""
+        lo = 0 if start is None else int(np.searchsorted(self._keys, np.datetime64(pd.Timestamp(start), 'ns'), 'left'))
+        hi = len(self._keys) if end is None else int(np.searchsorted(self._keys, np.datetime64(pd.Timestamp(end), 'ns'), 'right'))
+        return lo, max(lo, hi)
+
+    def window(self, start=None, end=None):
+        """Rows with start <= date <= end (either bound optional) as a slice of the sorted frame"""
+        lo, hi = self.bounds(start, end)
+        return self._frame.iloc[lo:hi]
+
+    def count(self, start=None, end=None, search=None, search_column='product_name'):
+        lo, hi = self.bounds(start, end)
+        if not search:
+            return hi - lo
+        names = self._frame[search_column].iloc[lo:hi]
+        return int(names.str.contains(search, case=False, regex=False, na=False).sum())
+
+    def page(self, start=None, end=None, page=0, page_size=50, sort_by=None, descending=True,
+             search=None, search_column='product_name'):
+        """One page of the window's rows and the number of rows matching
+
+        Sorting by date without a search is a positional slice of the sorted
+        frame. Other sorts and name searches only touch rows inside the
+        window, and only the rows up to the requested page are ordered.
+        """
+        lo, hi = self.bounds(start, end)
+        first = page * page_size
+        if not search and sort_by in (None, self.time_column):
+            if descending:
+                stop = max(lo, hi - first)
+                return self._frame.iloc[max(lo, stop - page_size):stop].iloc[::-1], hi - lo
+            begin = min(hi, lo + first)
+            return self._frame.iloc[begin:min(hi, begin + page_size)], hi - lo
+
+        rows = self._frame.iloc[lo:hi]
+        if search:
+            rows = rows[rows[search_column].str.contains(search, case=False, regex=False, na=False)]
+        sort_by = sort_by or self.time_column
+        if pd.api.types.is_numeric_dtype(rows[sort_by]) or pd.api.types.is_datetime64_any_dtype(rows[sort_by]):
+            # Partial selection: O(n log k) for the first k = first + page_size rows
+            select = rows.nlargest if descending else rows.nsmallest
+            ordered = select(first + page_size, sort_by, keep='first')
+        else:
+            ordered = rows.sort_values(sort_by, ascending=not descending, kind='stable')
+        return ordered.iloc[first:first + page_size], len(rows)
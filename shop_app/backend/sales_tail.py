@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pandas as pd
+
+from .read_cache import freeze_frame
+
+
+class IncrementalSheetReader:
+    """Tail reader for an append-only sheet
+
+    After the first full download it only requests the rows after the last one
+    it has seen, plus that last row again as an anchor. If the anchor no longer
+    matches (rows above it were edited, inserted or deleted), or resync_seconds
+    have passed since the last full download, the whole range is read again.
+    decode(rows) turns raw rows into a DataFrame, so each row is only
+    converted once, when it first arrives. version changes whenever the rows
+    held locally do.
+    """
+
+    def __init__(self, sheet_name, columns, first_row=2, last_column='D', resync_seconds=600.0, decode=None):
+        self.sheet_name = sheet_name
+        self.columns = columns
+        self.decode = decode or (lambda rows: pd.DataFrame(rows, columns=columns))
+        self.first_row = first_row
+        self.last_column = last_column
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._version = 0
+        self._reset()
+        self._stats = {'full_reads': 0, 'tail_reads': 0, 'rows_appended': 0, 'resyncs': 0}
+
+    def pending_range(self):
+        """Range that returns the anchor row followed by any new rows"""
+        with self._lock:
+            return self._pending_range()
+
+    def consume(self, values, requested_range):
+        """Apply the values returned for requested_range; False means a full read is needed"""
+        with self._lock:
+            if requested_range != self._pending_range():
+                return False  # State moved on since the range was handed out
+            if requested_range == self.full_range():
+                self._load_full(values)
+                return True
+
+            rows = [self._pad(row) for row in values]
+            if not rows or rows[0] != self._anchor:
+                self._stats['resyncs'] += 1
+                return False
+
+            new_rows = rows[1:]
+            if new_rows:
+                self._chunks.append(self.decode(new_rows))
+                self._row_count += len(new_rows)
+                self._anchor = new_rows[-1]
+                self._frame = None
+                self._version += 1
+                self._stats['rows_appended'] += len(new_rows)
+            self._stats['tail_reads'] += 1
+            return True
+
+    @property
+    def version(self):
+        """Monotonic counter of changes to the local rows"""
+        with self._lock:
+            return self._version
+
+    def full_range(self):
+        return f'{self.sheet_name}!A{self.first_row}:{self.last_column}'
+
+    def read(self, fetch):
+        """Bring the local copy up to date using fetch(range) -> values and return it"""
+        requested = self.pending_range()
+        if not self.consume(fetch(requested), requested):
+            values = fetch(self.full_range())
+            with self._lock:
+                self._reset()
+                self._load_full(values)
+        return self.frame()
+
+    def frame(self):
+        """Read-only DataFrame of every row consumed so far"""
+        with self._lock:
+            if self._frame is None:
+                if not self._chunks:
+                    self._frame = freeze_frame(self.decode([]))
+                else:
+                    merged = pd.concat(self._chunks, ignore_index=True)
+                    # Keep one chunk so later concatenations stay cheap
+                    self._chunks = [merged]
+                    self._frame = freeze_frame(merged)
+            return self._frame
+
+    def reset(self):
+        """Forget everything; the next read downloads the full range"""
+        with self._lock:
+            self._reset()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['rows'] = self._row_count
+        return stats
+
+    def _pending_range(self):
+        stale = time.time() - self._loaded_at > self.resync_seconds
+        if self._row_count == 0 or stale:
+            return self.full_range()
+        anchor_row = self.first_row + self._row_count - 1
+        return f'{self.sheet_name}!A{anchor_row}:{self.last_column}'
+
+    def _load_full(self, values):
+        rows = [self._pad(row) for row in values]
+        self._chunks = [self.decode(rows)] if rows else []
+        self._row_count = len(rows)
+        self._anchor = rows[-1] if rows else None
+        self._loaded_at = time.time()
+        self._frame = None
+        self._version += 1
+        self._stats['full_reads'] += 1
+
+    def _reset(self):
+        self._chunks = []
+        self._row_count = 0
+        self._anchor = None
+        self._loaded_at = 0.0
+        self._frame = None
+        self._version += 1
+
+    def _pad(self, row):
+        # The API drops trailing empty cells
+        row = list(row)
+        return row + [''] * (len(self.columns) - len(row))
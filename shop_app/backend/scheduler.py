@@ -0,0 +1,135 @@
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Priority lanes: lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+BULK = 2
+LANE_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background', BULK: 'bulk'}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+_lane = contextvars.ContextVar('sheets_request_lane', default=None)
+
+
+@contextmanager
+def request_priority(priority):
+    """Run Sheets requests made inside the block in the given lane by default"""
+    token = _lane.set(priority)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_priority(default=BACKGROUND):
+    """Lane set by the innermost request_priority() block, or default"""
+    priority = _lane.get()
+    return default if priority is None else priority
+
+
+def _status_of(error):
+    """HTTP status of a googleapiclient HttpError (or anything shaped like one)"""
+    resp = getattr(error, 'resp', None)
+    status = getattr(resp, 'status', None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """Single gate for every Sheets request
+
+    A token bucket holding requests_per_minute tokens refills continuously;
+    each request takes one. Waiting requests are served strictly by lane and
+    then arrival order, so a sale write never queues behind an export. Requests
+    failing with 429/5xx are retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute=60, max_retries=5, base_backoff=1.0, max_backoff=32.0):
+        self.capacity = float(requests_per_minute)
+        self.refill_per_second = requests_per_minute / 60.0
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._stats = {
+            lane: {'requests': 0, 'wait_seconds_total': 0.0, 'max_wait_seconds': 0.0,
+                   'throttled': 0, 'retries': 0, 'failures': 0}
+            for lane in LANE_NAMES
+        }
+
+    def execute(self, request, priority=INTERACTIVE):
+        """Run request.execute() once a token is available, retrying throttled calls"""
+        attempt = 0
+        while True:
+            self._acquire(priority)
+            try:
+                return request.execute()
+            except Exception as e:
+                status = _status_of(e)
+                if status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    with self._cond:
+                        self._stats[priority]['failures'] += 1
+                    raise
+                with self._cond:
+                    self._stats[priority]['retries'] += 1
+                    if status == 429:
+                        self._stats[priority]['throttled'] += 1
+                        # The server says the quota is spent; stop handing out tokens
+                        self._tokens = min(self._tokens, 0.0)
+                delay = random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+                time.sleep(delay)
+                attempt += 1
+
+    def stats(self):
+        """Per-lane request, wait-time, throttle and retry counters"""
+        with self._cond:
+            stats = {}
+            for lane, counters in self._stats.items():
+                lane_stats = dict(counters)
+                lane_stats['avg_wait_seconds'] = (
+                    counters['wait_seconds_total'] / counters['requests'] if counters['requests'] else 0.0
+                )
+                stats[LANE_NAMES[lane]] = lane_stats
+            stats['queued'] = len(self._waiting)
+            stats['tokens'] = self._tokens
+        return stats
+
+    def _acquire(self, priority):
+        started = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                self._refill()
+                if self._waiting[0] == ticket and self._tokens >= 1:
+                    heapq.heappop(self._waiting)
+                    self._tokens -= 1
+                    break
+                # Sleep until the next token is due (or someone ahead of us leaves)
+                timeout = max((1 - self._tokens) / self.refill_per_second, 0.01)
+                self._cond.wait(timeout)
+            waited = time.monotonic() - started
+            counters = self._stats[priority]
+            counters['requests'] += 1
+            counters['wait_seconds_total'] += waited
+            counters['max_wait_seconds'] = max(counters['max_wait_seconds'], waited)
+            self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.refill_per_second)
+        self._refilled_at = now
+
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+
+from . import config
+from .exceptions import SheetOperationError
+from .metrics import span
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+# Used only when neither the local copy nor googleapiclient's bundled Sheets document is available
+DISCOVERY_URL = 'https://sheets.googleapis.com/$discovery/rest?version=v4'
+HTTP_TIMEOUT_SECONDS = 30
+
+
+class SheetsClientManager:
+    """Process-wide owner of the Sheets credentials, HTTP connections and services
+
+    httplib2 connections are not thread-safe, so each thread gets its own
+    keep-alive connection and service object. The credentials (and the access
+    token they cache) and the parsed discovery document are shared by all threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._credentials = None
+        self._discovery_doc = None
+        self._generation = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'credential_loads': 0,
+            'discovery_loads': 0,
+            'build_seconds_total': 0.0,
+            'last_build_seconds': 0.0,
+        }
+
+    def get_service(self):
+        """Return this thread's Sheets service, building it on first use"""
+        if config.SHEETS_EMULATOR:
+            # The emulator is thread-safe, so every thread shares it
+            from .sheets_emulator import get_emulator
+            return get_emulator()
+
+        service = getattr(self._local, 'service', None)
+        if service is not None and self._local.generation == self._generation:
+            self._count('hits')
+            return service
+
+        self._count('misses')
+        started = time.perf_counter()
+        with span('sheets.service_build'):
+            http = self._authorized_http()
+            service = self._build(http)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._stats['build_seconds_total'] += elapsed
+            self._stats['last_build_seconds'] = elapsed
+            generation = self._generation
+
+        self._local.http = http
+        self._local.service = service
+        self._local.generation = generation
+        return service
+
+    def get_credentials(self):
+        """Load the service-account credentials once per process"""
+        if self._credentials is not None:
+            return self._credentials
+
+        with self._lock:
+            if self._credentials is None:
+                is_valid, message = config.validate_config()
+                if not is_valid:
+                    raise SheetOperationError(message)
+
+                from google.oauth2 import service_account
+
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    config.GOOGLE_SHEETS_CREDENTIALS_FILE,
+                    scopes=SCOPES
+                )
+                self._stats['credential_loads'] += 1
+        return self._credentials
+
+    def stats(self):
+        """Return a snapshot of the hit/miss and build-time counters"""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        """Drop cached credentials and services, e.g. after a config change"""
+        with self._lock:
+            self._credentials = None
+            self._discovery_doc = None
+            self._generation += 1
+
+    def _authorized_http(self):
+        import google_auth_httplib2
+        import httplib2
+
+        return google_auth_httplib2.AuthorizedHttp(
+            self.get_credentials(),
+            http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS)
+        )
+
+    def _build(self, http):
+        from googleapiclient.discovery import build_from_document
+
+        return build_from_document(self._get_discovery_doc(http), http=http)
+
+    def _get_discovery_doc(self, http):
+        if self._discovery_doc is not None:
+            return self._discovery_doc
+
+        with self._lock:
+            if self._discovery_doc is None:
+                document = _read_local_discovery_doc()
+                if document is None:
+                    try:
+                        from googleapiclient.discovery_cache import get_static_doc
+                        document = get_static_doc('sheets', 'v4')
+                    except ImportError:
+                        pass
+
+                if document is None:
+                    response, content = http.request(DISCOVERY_URL)
+                    if response.status != 200:
+                        raise SheetOperationError(
+                            f"Failed to fetch Sheets discovery document: HTTP {response.status}"
+                        )
+                    document = content
+                    # Later processes start without the network round-trip
+                    _write_local_discovery_doc(document)
+
+                self._discovery_doc = json.loads(document)
+                self._stats['discovery_loads'] += 1
+        return self._discovery_doc
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+def _read_local_discovery_doc():
+    """The discovery document saved at SHEETS_DISCOVERY_PATH, or None"""
+    try:
+        with open(config.SHEETS_DISCOVERY_PATH, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_local_discovery_doc(document):
+    """Save a downloaded discovery document; failing to cache it is not an error"""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(config.SHEETS_DISCOVERY_PATH)), exist_ok=True)
+        temporary = f'{config.SHEETS_DISCOVERY_PATH}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(document if isinstance(document, bytes) else document.encode('utf-8'))
+        os.replace(temporary, config.SHEETS_DISCOVERY_PATH)
+    except OSError:
+        pass
+
+
+_manager = SheetsClientManager()
+
+
+def get_client_manager():
+    """Return the process-wide Sheets client manager"""
+    return _manager
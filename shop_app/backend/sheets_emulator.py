@@ -0,0 +1,338 @@
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+_A1 = re.compile(r"^(?P<sheet>'[^']+'|[^!]+)!(?P<c1>[A-Z]+)(?P<r1>\d+)?(?::(?P<c2>[A-Z]+)(?P<r2>\d+)?)?$")
+_NUMBER = re.compile(r'^-?\d+(\.\d+)?$')
+_DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+EDIT_KINDS = ('append_sale', 'insert_stock_row', 'delete_stock_row', 'edit_quantity')
+
+
+class _Response:
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+
+class EmulatedHttpError(Exception):
+    """Raised like googleapiclient's HttpError; resp.status carries the HTTP status"""
+
+    def __init__(self, status, reason):
+        super().__init__(f"HTTP {status}: {reason}")
+        self.resp = _Response(status, reason)
+        self.status_code = status
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _column_letters(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def parse_range(range_name):
+    """(sheet, first row, last row or None, first column, last column) for an A1 range; 0-based"""
+    match = _A1.match(range_name)
+    if match is None:
+        raise EmulatedHttpError(400, f"Unable to parse range: {range_name}")
+    sheet = match['sheet'].strip("'")
+    first_col = _column_index(match['c1'])
+    first_row = int(match['r1'] or 1) - 1
+    if match['c2'] is None:  # Single cell
+        return sheet, first_row, first_row, first_col, first_col
+    last_row = int(match['r2']) - 1 if match['r2'] else None
+    return sheet, first_row, last_row, first_col, _column_index(match['c2'])
+
+
+def _parse_input(value, input_option):
+    """Store a cell the way Sheets does for RAW or USER_ENTERED input"""
+    if input_option != 'USER_ENTERED' or not isinstance(value, str):
+        return value
+    text = value.strip()
+    if _NUMBER.match(text):
+        number = float(text)
+        return int(number) if number.is_integer() and '.' not in text else number
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            pass
+    return value
+
+
+def _render(value, value_option, date_option):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, datetime):
+        if value_option == 'UNFORMATTED_VALUE' and date_option != 'FORMATTED_STRING':
+            return (value - SHEETS_EPOCH).total_seconds() / 86400
+        return value.strftime('%Y-%m-%d %H:%M:%S' if value.time() != datetime.min.time() else '%Y-%m-%d')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value_option == 'UNFORMATTED_VALUE':
+            return value
+        return str(int(value)) if float(value).is_integer() else str(value)
+    return value
+
+
+def _trim(rows):
+    """Drop trailing empty cells and rows, as the API does"""
+    trimmed = []
+    for row in rows:
+        while row and row[-1] == '':
+            row = row[:-1]
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class _Request:
+    """Deferred call with the googleapiclient request interface"""
+
+    def __init__(self, emulator, method, call):
+        self._emulator = emulator
+        self._method = method
+        self._call = call
+        self.methodId = f'sheets.spreadsheets.values.{method}'
+
+    def execute(self, num_retries=0):
+        return self._emulator._run(self._method, self._call)
+
+
+class _Values:
+    def __init__(self, emulator):
+        self._emulator = emulator
+
+    def get(self, spreadsheetId, range, majorDimension='ROWS',
+            valueRenderOption='FORMATTED_VALUE', dateTimeRenderOption='SERIAL_NUMBER'):
+        return _Request(self._emulator, 'get', lambda: self._emulator.get_values(
+            range, majorDimension, valueRenderOption, dateTimeRenderOption))
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension='ROWS',
+                 valueRenderOption='FORMATTED_VALUE', dateTimeRenderOption='SERIAL_NUMBER'):
+        return _Request(self._emulator, 'batchGet', lambda: {
+            'spreadsheetId': spreadsheetId,
+            'valueRanges': [
+                self._emulator.get_values(range_name, majorDimension, valueRenderOption, dateTimeRenderOption)
+                for range_name in ranges
+            ]
+        })
+
+    def append(self, spreadsheetId, range, valueInputOption='RAW', body=None, insertDataOption=None):
+        return _Request(self._emulator, 'append', lambda: self._emulator.append_values(
+            range, (body or {}).get('values', []), valueInputOption))
+
+    def update(self, spreadsheetId, range, valueInputOption='RAW', body=None):
+        return _Request(self._emulator, 'update', lambda: self._emulator.update_values(
+            range, (body or {}).get('values', []), valueInputOption))
+
+    def batchUpdate(self, spreadsheetId, body=None):
+        body = body or {}
+        return _Request(self._emulator, 'batchUpdate', lambda: {
+            'spreadsheetId': spreadsheetId,
+            'responses': [
+                self._emulator.update_values(data['range'], data.get('values', []),
+                                             body.get('valueInputOption', 'RAW'))
+                for data in body.get('data', [])
+            ]
+        })
+
+
+class _Spreadsheets:
+    def __init__(self, emulator):
+        self._values = _Values(emulator)
+
+    def values(self):
+        return self._values
+
+
+class SheetsEmulator:
+    """In-process stand-in for the Sheets v4 spreadsheets().values() API
+
+    Supports get, batchGet, append, update and batchUpdate on A1 ranges with
+    RAW/USER_ENTERED input and FORMATTED/UNFORMATTED rendering. Every call can
+    be slowed by latency_seconds (+ up to jitter_seconds), rejected with 429
+    once quota_per_minute calls were made in the last minute or at random
+    with error_rate, and preceded by a simulated edit from another user with
+    edit_rate (appended sales, inserted or deleted stock rows, changed
+    quantities). Use it as the service object returned by the client manager.
+    """
+
+    def __init__(self, sheets=None, latency_seconds=0.0, jitter_seconds=0.0, quota_per_minute=0,
+                 error_rate=0.0, edit_rate=0.0, seed=None):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.edit_rate = edit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sheets = {name: [list(row) for row in rows] for name, rows in (sheets or {}).items()}
+        self._calls = []  # Monotonic times of calls within the last minute
+        self._stats = {'calls': {}, 'throttled': 0, 'injected_errors': 0, 'edits': {}}
+        self._spreadsheets = _Spreadsheets(self)
+
+    # Service interface
+
+    def spreadsheets(self):
+        return self._spreadsheets
+
+    # Data access (also usable directly by tests and benchmarks)
+
+    def get_values(self, range_name, major_dimension='ROWS', value_option='FORMATTED_VALUE',
+                   date_option='SERIAL_NUMBER'):
+        sheet, first_row, last_row, first_col, last_col = parse_range(range_name)
+        with self._lock:
+            rows = self._sheet(sheet)
+            stop = len(rows) if last_row is None else min(last_row + 1, len(rows))
+            block = [
+                [_render(row[col] if col < len(row) else None, value_option, date_option)
+                 for col in range(first_col, last_col + 1)]
+                for row in rows[first_row:stop]
+            ]
+        if major_dimension == 'COLUMNS':
+            block = [list(column) for column in zip(*block)] if block else []
+        result = {'range': range_name, 'majorDimension': major_dimension}
+        values = _trim(block)
+        if values:
+            result['values'] = values
+        return result
+
+    def append_values(self, range_name, values, input_option='RAW'):
+        sheet, _, _, first_col, _ = parse_range(range_name)
+        with self._lock:
+            rows = self._sheet(sheet)
+            while rows and not any(cell not in (None, '') for cell in rows[-1]):
+                rows.pop()
+            start = len(rows)
+            for row in values:
+                rows.append([None] * first_col + [_parse_input(value, input_option) for value in row])
+            width = max((len(row) for row in values), default=1)
+        updated = (f"{sheet}!{_column_letters(first_col)}{start + 1}:"
+                   f"{_column_letters(first_col + width - 1)}{start + len(values)}")
+        return {'updates': {'updatedRange': updated, 'updatedRows': len(values),
+                            'updatedCells': sum(len(row) for row in values)}}
+
+    def update_values(self, range_name, values, input_option='RAW'):
+        sheet, first_row, _, first_col, _ = parse_range(range_name)
+        with self._lock:
+            rows = self._sheet(sheet)
+            for offset, row in enumerate(values):
+                target = first_row + offset
+                while len(rows) <= target:
+                    rows.append([])
+                cells = rows[target]
+                for col_offset, value in enumerate(row):
+                    col = first_col + col_offset
+                    if len(cells) <= col:
+                        cells.extend([None] * (col + 1 - len(cells)))
+                    cells[col] = _parse_input(value, input_option)
+        return {'updatedRange': range_name, 'updatedRows': len(values),
+                'updatedCells': sum(len(row) for row in values)}
+
+    def set_rows(self, sheet, rows):
+        """Replace a sheet's contents (header included) with rows of stored cell values"""
+        with self._lock:
+            self._sheets[sheet] = [list(row) for row in rows]
+
+    def simulate_edit(self, kind=None):
+        """Apply one edit as if another user changed the spreadsheet; returns the kind applied"""
+        kind = kind or self._random.choice(EDIT_KINDS)
+        with self._lock:
+            stock = self._sheets.get('Stock', [])
+            sales = self._sheets.get('Sales')
+            data_rows = len(stock) - 1
+            if kind == 'append_sale' and data_rows > 0 and sales is not None:
+                product = stock[self._random.randint(1, data_rows)]
+                product_id = product[6] if len(product) > 6 else ''
+                sales.append([product_id, datetime.now().replace(microsecond=0), 1, product[3] if len(product) > 3 else 0])
+            elif kind == 'insert_stock_row' and stock:
+                stock.insert(1, ['Emulated product', datetime.now().replace(microsecond=0), 1.0, 2.0,
+                                 'Emulator', 5, f"EMU{self._random.randrange(10 ** 9)}"])
+            elif kind == 'delete_stock_row' and data_rows > 0:
+                del stock[self._random.randint(1, data_rows)]
+            elif kind == 'edit_quantity' and data_rows > 0:
+                row = stock[self._random.randint(1, data_rows)]
+                row.extend([None] * (6 - len(row)))
+                row[5] = self._random.randint(0, 100)
+            else:
+                return None
+            self._stats['edits'][kind] = self._stats['edits'].get(kind, 0) + 1
+        return kind
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': dict(self._stats['calls']),
+                'throttled': self._stats['throttled'],
+                'injected_errors': self._stats['injected_errors'],
+                'edits': dict(self._stats['edits']),
+                'rows': {name: max(len(rows) - 1, 0) for name, rows in self._sheets.items()},
+            }
+
+    def _sheet(self, name):
+        if name not in self._sheets:
+            raise EmulatedHttpError(400, f"Unable to parse range: {name}")
+        return self._sheets[name]
+
+    def _run(self, method, call):
+        delay = self.latency_seconds
+        if self.jitter_seconds:
+            delay += self._random.uniform(0, self.jitter_seconds)
+        if delay:
+            time.sleep(delay)
+
+        with self._lock:
+            self._stats['calls'][method] = self._stats['calls'].get(method, 0) + 1
+            now = time.monotonic()
+            self._calls = [at for at in self._calls if now - at < 60]
+            if self.quota_per_minute and len(self._calls) >= self.quota_per_minute:
+                self._stats['throttled'] += 1
+                raise EmulatedHttpError(429, "Quota exceeded for quota metric 'Read requests'")
+            self._calls.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self._stats['injected_errors'] += 1
+                raise EmulatedHttpError(429, "Injected rate limit error")
+            edit = self.edit_rate and self._random.random() < self.edit_rate
+
+        if edit:
+            self.simulate_edit()
+        return call()
+
+
+_emulator = None
+_emulator_lock = threading.Lock()
+
+
+def get_emulator():
+    """Process-wide emulator configured from config, with the Stock and Sales headers in place"""
+    global _emulator
+    with _emulator_lock:
+        if _emulator is None:
+            from . import config
+            from .sheets_utils import STOCK_COLUMNS, SALES_COLUMNS
+
+            _emulator = SheetsEmulator(
+                sheets={config.STOCK_SHEET: [STOCK_COLUMNS], config.SALES_SHEET: [SALES_COLUMNS]},
+                latency_seconds=config.SHEETS_EMULATOR_LATENCY_MS / 1000.0,
+                jitter_seconds=config.SHEETS_EMULATOR_JITTER_MS / 1000.0,
+                quota_per_minute=config.SHEETS_EMULATOR_QUOTA_PER_MINUTE,
+                error_rate=config.SHEETS_EMULATOR_ERROR_RATE,
+                edit_rate=config.SHEETS_EMULATOR_EDIT_RATE,
+                seed=config.SHEETS_EMULATOR_SEED
+            )
+    return _emulator
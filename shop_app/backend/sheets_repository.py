@@ -0,0 +1,104 @@
+import threading
+
+from . import sheets_utils
+from .exceptions import SheetOperationError
+from .models import StockItem
+from .repository import (
+    ShopRepository, STOCK_FIELDS, SALE_FIELDS, STOCK_DTYPES, SALE_DTYPES,
+    capture_cost_basis, check_sale, ensure_product_id, typed_frame
+)
+
+# Sheet headers -> model field names
+STOCK_SHEET_FIELDS = {
+    'Product ID': 'product_id', 'Product Name': 'product_name', 'Date Added': 'date_added',
+    'Purchase Price': 'purchase_price', 'Selling Price': 'selling_price',
+    'Supplier': 'supplier', 'Quantity': 'quantity'
+}
+SALES_SHEET_FIELDS = {
+    'Product ID': 'product_id', 'Date of Sale': 'date_of_sale',
+    'Quantity Sold': 'quantity_sold', 'Total Price': 'total_price',
+    'Product Name': 'product_name', 'Unit Price': 'unit_price', 'Unit Cost': 'unit_cost'
+}
+
+
+def _typed(frame, mapping, fields, dtypes):
+    # Sheet frames are already typed by the sheets_utils codec; only names and categories change
+    return typed_frame(frame.rename(columns=mapping), fields, dtypes)
+
+
+class SheetsRepository(ShopRepository):
+    """Repository over the Google Sheets Stock and Sales sheets
+
+    Reads go through the sheets_utils read cache, appends through its
+    write-behind queue. The version combines the read cache's counters,
+    which change when it picks up new sheet contents, with a count of our
+    own writes, which are visible before the queue has flushed them. CSV
+    import is not offered: it replaces all data, which the sheets' other
+    editors would lose.
+    """
+
+    supports_import = False
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @property
+    def version(self):
+        return sheets_utils.data_version(), self._writes
+
+    def get_stock(self, product_id):
+        frame = self.stock_frame()
+        matches = frame[frame['product_id'] == product_id]
+        if matches.empty:
+            return None
+        return StockItem(**matches.iloc[0].to_dict())
+
+    def add_stock(self, item):
+        ensure_product_id(item)
+        sheets_utils.append_stock({
+            'Product ID': item.product_id,
+            'Product Name': item.product_name,
+            'Purchase Price': item.purchase_price,
+            'Selling Price': item.selling_price,
+            'Supplier': item.supplier,
+            'Quantity': item.quantity,
+        })
+        with self._lock:
+            self._writes += 1
+        return item
+
+    def set_quantity(self, product_id, quantity):
+        sheets_utils.update_stock_quantity(product_id, quantity)
+        with self._lock:
+            self._writes += 1
+
+    def record_sale(self, sale):
+        # Sheets has no transactions; serialize our own check-then-write
+        with self._lock:
+            item = self.get_stock(sale.product_id)
+            check_sale(item, sale)
+            capture_cost_basis(item, sale)
+            sheets_utils.update_stock_quantity(sale.product_id, item.quantity - sale.quantity_sold)
+            sheets_utils.record_sale(
+                sale.product_id, sale.quantity_sold, sale.total_price, sale.date_of_sale,
+                sale.product_name, sale.unit_price, sale.unit_cost
+            )
+            self._writes += 1
+        return sale
+
+    def import_stock(self, chunks):
+        raise SheetOperationError("CSV import is not available with Google Sheets storage; edit the Stock sheet directly")
+
+    def import_sales(self, chunks):
+        raise SheetOperationError("CSV import is not available with Google Sheets storage; edit the Sales sheet directly")
+
+    def _load_stock_frame(self):
+        return _typed(sheets_utils.read_stock_sheet(), STOCK_SHEET_FIELDS, STOCK_FIELDS, STOCK_DTYPES)
+
+    def _load_sales_frame(self):
+        frame = sheets_utils.read_sales_sheet()
+        # Rows from before the cost basis was recorded have a blank name; let with_cost_basis fill it
+        frame = frame.assign(**{'Product Name': frame['Product Name'].mask(frame['Product Name'] == '')})
+        return _typed(frame, SALES_SHEET_FIELDS, SALE_FIELDS, SALE_DTYPES)
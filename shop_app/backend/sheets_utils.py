@@ -1,103 +1,325 @@
-from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-import pandas as pd
+import threading
 from datetime import datetime
-import config
-
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+from . import config
 
 from .exceptions import SheetOperationError
-import os
+from .sheets_client import get_client_manager
+from .write_queue import WriteBehindQueue
+from .row_index import ProductRowIndex
+from .read_cache import ReadThroughCache, freeze_frame
+from .sales_tail import IncrementalSheetReader
+from .sales_index import SalesTimeIndex
+from .codec import SheetCodec, TEXT, FLOAT, INT, DATETIME, CATEGORY
+from .scheduler import RequestScheduler, INTERACTIVE, BACKGROUND, LANE_NAMES, current_priority, request_priority
+from .metrics import span
+
+STOCK_RANGE = 'Stock!A2:G'
+SALES_RANGE = 'Sales!A2:G'
+STOCK_ID_COLUMN = 'G'  # Product ID
+STOCK_COLUMNS = [
+    'Product Name', 'Date Added', 'Purchase Price',
+    'Selling Price', 'Supplier', 'Quantity', 'Product ID'
+]
+SALES_COLUMNS = [
+    'Product ID', 'Date of Sale', 'Quantity Sold', 'Total Price',
+    'Product Name', 'Unit Price', 'Unit Cost'
+]
+STOCK_CODEC = SheetCodec(STOCK_COLUMNS, {
+    'Product Name': TEXT, 'Date Added': DATETIME, 'Purchase Price': FLOAT,
+    'Selling Price': FLOAT, 'Supplier': CATEGORY, 'Quantity': INT, 'Product ID': TEXT
+})
+SALES_CODEC = SheetCodec(SALES_COLUMNS, {
+    'Product ID': TEXT, 'Date of Sale': DATETIME, 'Quantity Sold': INT, 'Total Price': FLOAT,
+    'Product Name': TEXT, 'Unit Price': FLOAT, 'Unit Cost': FLOAT
+})
+_SHEET_CODECS = {STOCK_RANGE: STOCK_CODEC, SALES_RANGE: SALES_CODEC}
+
+# Numbers as numbers and dates as serial numbers; SheetCodec does the typing
+_VALUE_RENDER = {'valueRenderOption': 'UNFORMATTED_VALUE', 'dateTimeRenderOption': 'SERIAL_NUMBER'}
+
+_write_queue = None
+_singleton_lock = threading.Lock()
+_stock_index = None
+_sales_time_index = (None, None)  # (sales frame, SalesTimeIndex over it)
+_read_cache = ReadThroughCache(
+    ttl_seconds=config.READ_CACHE_TTL_SECONDS,
+    max_stale_seconds=config.READ_CACHE_MAX_STALE_SECONDS,
+    max_entries=config.READ_CACHE_MAX_ENTRIES
+)
+_scheduler = RequestScheduler(
+    requests_per_minute=config.SHEETS_REQUESTS_PER_MINUTE,
+    max_retries=config.SHEETS_MAX_RETRIES
+)
+_sales_reader = IncrementalSheetReader(
+    config.SALES_SHEET,
+    SALES_COLUMNS,
+    last_column='G',
+    resync_seconds=config.SALES_RESYNC_SECONDS,
+    decode=lambda rows: _decode(SALES_RANGE, rows)
+)
 
 def get_google_sheets_service():
-    """Initialize and return Google Sheets service"""
+    """Return the shared Google Sheets service for the current thread"""
     try:
-        # Validate configuration first
-        is_valid, message = config.validate_config()
-        if not is_valid:
-            raise SheetOperationError(message)
-            
-        creds = service_account.Credentials.from_service_account_file(
-            config.GOOGLE_SHEETS_CREDENTIALS_FILE,
-            scopes=SCOPES
-        )
-        service = build('sheets', 'v4', credentials=creds)
-        return service
+        return get_client_manager().get_service()
     except Exception as e:
         if isinstance(e, SheetOperationError):
             raise e
         raise SheetOperationError(f"Failed to initialize Google Sheets service: {str(e)}")
 
-def read_stock_sheet():
-    """Read data from the Stock sheet"""
+def get_scheduler():
+    """Return the scheduler every Sheets request goes through"""
+    return _scheduler
+
+def _execute(request, priority=None):
+    """Execute a Sheets request through the quota-aware scheduler
+
+    Without an explicit priority the request runs in the lane chosen by the
+    caller's request_priority() block, or the background lane.
+    """
+    if priority is None:
+        priority = current_priority(BACKGROUND)
+    method = getattr(request, 'methodId', 'request').rsplit('.', 1)[-1]
+    # Includes time spent waiting for a quota token; the scheduler's stats() break that out
+    with span('sheets.request', method=method, lane=LANE_NAMES[priority]) as timing:
+        body = getattr(request, 'body', None)
+        if isinstance(body, (str, bytes)):
+            timing.record(bytes=len(body))
+        result = _scheduler.execute(request, priority)
+        timing.record(rows=_response_rows(result))
+    return result
+
+def _response_rows(result):
+    """Rows a values() response carries, or reports as written"""
+    if not isinstance(result, dict):
+        return 0
+    if 'valueRanges' in result:
+        return sum(_response_rows(value_range) for value_range in result['valueRanges'])
+    if 'updates' in result:
+        return result['updates'].get('updatedRows', 0)
+    if 'updatedRows' in result:
+        return result['updatedRows']
+    values = result.get('values', [])
+    if result.get('majorDimension') == 'COLUMNS':
+        return len(values[0]) if values else 0
+    return len(values)
+
+def get_write_queue():
+    """Return the process-wide write-behind queue for row appends"""
+    global _write_queue
+    with _singleton_lock:
+        if _write_queue is None:
+            _write_queue = WriteBehindQueue(
+                _append_rows,
+                config.WRITE_QUEUE_JOURNAL,
+                max_batch_rows=config.WRITE_QUEUE_MAX_ROWS,
+                max_age_seconds=config.WRITE_QUEUE_MAX_AGE_SECONDS,
+                # Before the journal replay starts flushing, so replayed rows update our state too
+                listeners=[_on_rows_appended]
+            )
+    return _write_queue
+
+def get_stock_index():
+    """Return the process-wide Product ID -> Stock row index"""
+    global _stock_index
+    with _singleton_lock:
+        if _stock_index is None:
+            _stock_index = ProductRowIndex(_fetch_stock_ids, _probe_stock_id)
+    return _stock_index
+
+def _fetch_stock_ids():
+    """Read only the Product ID column of the Stock sheet"""
+    service = get_google_sheets_service()
+    result = _execute(service.spreadsheets().values().get(
+        spreadsheetId=config.SPREADSHEET_ID,
+        range=f'Stock!{STOCK_ID_COLUMN}2:{STOCK_ID_COLUMN}',
+        majorDimension='COLUMNS'
+    ))
+    columns = result.get('values', [])
+    return columns[0] if columns else []
+
+def _probe_stock_id(row_idx):
+    """Read the single Product ID cell of a Stock row"""
+    service = get_google_sheets_service()
+    result = _execute(service.spreadsheets().values().get(
+        spreadsheetId=config.SPREADSHEET_ID,
+        range=f'Stock!{STOCK_ID_COLUMN}{row_idx}'
+    ))
+    values = result.get('values', [])
+    return values[0][0] if values and values[0] else None
+
+def _on_rows_appended(range_name, rows, response):
+    """Keep derived state in step with rows flushed by the write queue"""
+    _read_cache.invalidate(range_name)
+    if range_name == STOCK_RANGE:
+        updated_range = (response or {}).get('updates', {}).get('updatedRange')
+        get_stock_index().record_append([row[6] for row in rows], updated_range)
+
+def _append_rows(range_name, rows):
+    """Append a batch of rows to a sheet in a single request"""
+    service = get_google_sheets_service()
+    return _execute(service.spreadsheets().values().append(
+        spreadsheetId=config.SPREADSHEET_ID,
+        range=range_name,
+        valueInputOption='USER_ENTERED',
+        body={'values': rows}
+    ), INTERACTIVE)
+
+def _probe_sheet(sheet_name):
+    """Cheap revision token for a sheet: its row count and last first-column value"""
+    service = get_google_sheets_service()
+    result = _execute(service.spreadsheets().values().get(
+        spreadsheetId=config.SPREADSHEET_ID,
+        range=f'{sheet_name}!A2:A',
+        majorDimension='COLUMNS'
+    ))
+    columns = result.get('values', [])
+    column = columns[0] if columns else []
+    return len(column), column[-1] if column else None
+
+def _fetch_values(range_name):
+    """Download the unformatted values of one range"""
+    service = get_google_sheets_service()
+    result = _execute(service.spreadsheets().values().get(
+        spreadsheetId=config.SPREADSHEET_ID,
+        range=range_name,
+        **_VALUE_RENDER
+    ))
+    return result.get('values', [])
+
+def _load_sheet(range_name):
+    """Download a range and return it as a typed, read-only DataFrame"""
+    return _frame_from_values(_fetch_values(range_name), range_name)
+
+def _load_sales():
+    """Bring the Sales tail reader up to date, fetching only new rows"""
+    return _sales_reader.read(_fetch_values)
+
+def _decode(range_name, values):
+    """Type raw sheet values with the range's codec"""
+    with span('sheets.decode', sheet=range_name.split('!')[0]) as timing:
+        timing.record(rows=len(values))
+        return _SHEET_CODECS[range_name].decode(values)
+
+def _frame_from_values(values, range_name):
+    """Build a typed, read-only DataFrame from raw sheet values"""
+    return freeze_frame(_decode(range_name, values))
+
+def _batch_load(range_names):
+    """Download several ranges with one values().batchGet request"""
+    # Sales is read incrementally: ask only for its anchor row and anything after it
+    requested = [
+        _sales_reader.pending_range() if range_name == SALES_RANGE else range_name
+        for range_name in range_names
+    ]
+    service = get_google_sheets_service()
+    result = _execute(service.spreadsheets().values().batchGet(
+        spreadsheetId=config.SPREADSHEET_ID,
+        ranges=requested,
+        **_VALUE_RENDER
+    ))
+    value_ranges = result.get('valueRanges', [])
+    
+    # valueRanges come back in request order
+    frames = {}
+    for range_name, request_range, value_range in zip(range_names, requested, value_ranges):
+        values = value_range.get('values', [])
+        if range_name == SALES_RANGE:
+            if _sales_reader.consume(values, request_range):
+                frames[range_name] = _sales_reader.frame()
+            else:
+                frames[range_name] = _load_sales()
+        else:
+            frames[range_name] = _frame_from_values(values, range_name)
+    return frames
+
+def read_sheets(*range_names):
+    """Read several sheet ranges in one round-trip, returning frames in argument order
+
+    Ranges already fresh in the read cache are served from it; the rest are
+    fetched together with a single batchGet.
+    """
     try:
         if not config.SPREADSHEET_ID:
             raise SheetOperationError("Spreadsheet ID not configured")
-            
-        service = get_google_sheets_service()
-        sheet = service.spreadsheets()
         
-        result = sheet.values().get(
-            spreadsheetId=config.SPREADSHEET_ID,
-            range='Stock!A2:G'  # Assuming headers are in row 1
-        ).execute()
-            
-        values = result.get('values', [])
+        # Make our own queued appends visible before reading
+        for range_name in range_names:
+            get_write_queue().flush(range_name)
+        
+        return _read_cache.get_many(list(range_names), _batch_load)
     except Exception as e:
         if isinstance(e, SheetOperationError):
             raise e
-        raise SheetOperationError(f"Failed to read Stock sheet: {str(e)}")
-    
-    if not values:
-        return pd.DataFrame(columns=[
-            'Product Name', 'Date Added', 'Purchase Price', 
-            'Selling Price', 'Supplier', 'Quantity', 'Product ID'
-        ])
-    
-    return pd.DataFrame(values, columns=[
-        'Product Name', 'Date Added', 'Purchase Price', 
-        'Selling Price', 'Supplier', 'Quantity', 'Product ID'
-    ])
+        raise SheetOperationError(f"Failed to read {', '.join(range_names)}: {str(e)}")
 
-def read_sales_sheet():
-    """Read data from the Sales sheet"""
+def read_stock_and_sales():
+    """Read the Stock and Sales sheets together, returning (stock_df, sales_df)"""
+    stock_df, sales_df = read_sheets(STOCK_RANGE, SALES_RANGE)
+    return stock_df, sales_df
+
+def _read_sheet(sheet_name, range_name, loader, probe=None):
+    """Read a sheet through the shared cache"""
     try:
         if not config.SPREADSHEET_ID:
             raise SheetOperationError("Spreadsheet ID not configured")
-            
-        service = get_google_sheets_service()
-        sheet = service.spreadsheets()
         
-        result = sheet.values().get(
-            spreadsheetId=config.SPREADSHEET_ID,
-            range='Sales!A2:D'  # Assuming headers are in row 1
-        ).execute()
-            
-        values = result.get('values', [])
+        # Make our own queued appends visible before reading
+        get_write_queue().flush(range_name)
+        
+        return _read_cache.get(range_name, loader, probe)
     except Exception as e:
         if isinstance(e, SheetOperationError):
             raise e
-        raise SheetOperationError(f"Failed to read Sales sheet: {str(e)}")
-    
-    if not values:
-        return pd.DataFrame(columns=[
-            'Product ID', 'Date of Sale', 'Quantity Sold', 'Total Price'
-        ])
-    
-    return pd.DataFrame(values, columns=[
-        'Product ID', 'Date of Sale', 'Quantity Sold', 'Total Price'
-    ])
+        raise SheetOperationError(f"Failed to read {sheet_name} sheet: {str(e)}")
+
+def read_stock_sheet():
+    """Read data from the Stock sheet (cached; the returned frame is read-only)"""
+    return _read_sheet(
+        config.STOCK_SHEET,
+        STOCK_RANGE,
+        lambda: _load_sheet(STOCK_RANGE),
+        lambda: _probe_sheet(config.STOCK_SHEET)
+    )
+
+def read_sales_sheet():
+    """Read data from the Sales sheet (cached; the returned frame is read-only)
+
+    The sheet is append-only, so after the first read only new rows are fetched.
+    """
+    return _read_sheet(config.SALES_SHEET, SALES_RANGE, _load_sales)
+
+def data_version():
+    """Monotonic version of the Stock and Sales data this process has read
+
+    Only touches the network when either sheet is past its cache TTL, in which
+    case both are refreshed (one batchGet) so the version can pick up edits.
+    """
+    if not _read_cache.is_fresh([STOCK_RANGE, SALES_RANGE]):
+        read_stock_and_sales()
+    return _read_cache.version, _sales_reader.version
+
+def get_sales_index(sales_df):
+    """SalesTimeIndex for a frame returned by the Sales readers, reused while the frame is unchanged"""
+    global _sales_time_index
+    frame, index = _sales_time_index
+    if frame is not sales_df:
+        index = SalesTimeIndex(sales_df, time_column='Date of Sale')
+        _sales_time_index = (sales_df, index)
+    return index
+
+def invalidate_read_cache(range_name=None):
+    """Drop cached sheet frames so the next read downloads them again"""
+    _read_cache.invalidate(range_name)
+    if range_name in (None, SALES_RANGE):
+        _sales_reader.reset()
 
 def append_stock(product_data):
-    """Add new stock entry to the Stock sheet"""
-    service = get_google_sheets_service()
-    sheet = service.spreadsheets()
-    
-    # Generate unique Product ID (timestamp-based)
-    product_id = f"P{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    """Queue a new stock entry for the Stock sheet and return its Product ID"""
+    # Use the caller's Product ID, or generate a unique one (timestamp-based)
+    product_id = product_data.get('Product ID') or f"P{datetime.now().strftime('%Y%m%d%H%M%S')}"
     
-    values = [[
+    values = [
         product_data['Product Name'],
         datetime.now().strftime('%Y-%m-%d'),
         product_data['Purchase Price'],
@@ -105,38 +327,23 @@ def append_stock(product_data):
         product_data['Supplier'],
         product_data['Quantity'],
         product_id
-    ]]
-    
-    body = {
-        'values': values
-    }
+    ]
     
-    result = sheet.values().append(
-        spreadsheetId=config.SPREADSHEET_ID,
-        range='Stock!A2:G',
-        valueInputOption='USER_ENTERED',
-        body=body
-    ).execute()
+    get_write_queue().enqueue(STOCK_RANGE, values)
     
     return product_id
 
 def update_stock_quantity(product_id, new_quantity):
     """Update stock quantity for a specific product"""
-    service = get_google_sheets_service()
-    sheet = service.spreadsheets()
+    # The product may still be waiting in the write queue
+    get_write_queue().flush(STOCK_RANGE)
     
-    # First, find the row with the product ID
-    result = sheet.values().get(
-        spreadsheetId=config.SPREADSHEET_ID,
-        range='Stock!A2:G'
-    ).execute()
-    values = result.get('values', [])
-    
-    row_idx = None
-    for idx, row in enumerate(values):
-        if row[6] == product_id:  # Product ID is in column G (index 6)
-            row_idx = idx + 2  # Add 2 because we start from A2
-            break
+    # One cheap lookup instead of downloading and scanning the whole sheet
+    try:
+        with request_priority(INTERACTIVE):
+            row_idx = get_stock_index().find_row(product_id)
+    except Exception as e:
+        raise SheetOperationError(f"Failed to locate Product ID {product_id}: {str(e)}")
     
     if row_idx is None:
         raise ValueError(f"Product ID {product_id} not found")
@@ -147,36 +354,31 @@ def update_stock_quantity(product_id, new_quantity):
         'values': [[str(new_quantity)]]
     }
     
-    result = sheet.values().update(
+    service = get_google_sheets_service()
+    result = _execute(service.spreadsheets().values().update(
         spreadsheetId=config.SPREADSHEET_ID,
         range=range_name,
         valueInputOption='USER_ENTERED',
         body=body
-    ).execute()
+    ), INTERACTIVE)
+    _read_cache.invalidate(STOCK_RANGE)
     
     return result
 
-def record_sale(product_id, quantity_sold, total_price):
-    """Record a new sale in the Sales sheet"""
-    service = get_google_sheets_service()
-    sheet = service.spreadsheets()
-    
-    values = [[
+def record_sale(product_id, quantity_sold, total_price, date_of_sale=None,
+                product_name=None, unit_price=None, unit_cost=None):
+    """Queue a new sale for the Sales sheet and return its write ticket
+
+    product_name, unit_price and unit_cost record the cost basis at sale time.
+    """
+    values = [
         product_id,
-        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        (date_of_sale or datetime.now()).strftime('%Y-%m-%d %H:%M:%S'),
         str(quantity_sold),
-        str(total_price)
-    ]]
-    
-    body = {
-        'values': values
-    }
-    
-    result = sheet.values().append(
-        spreadsheetId=config.SPREADSHEET_ID,
-        range='Sales!A2:D',
-        valueInputOption='USER_ENTERED',
-        body=body
-    ).execute()
+        str(total_price),
+        product_name or '',
+        '' if unit_price is None else str(unit_price),
+        '' if unit_cost is None else str(unit_cost)
+    ]
     
-    return result
\ No newline at end of file
+    return get_write_queue().enqueue(SALES_RANGE, values)
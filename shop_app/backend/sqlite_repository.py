@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from .models import StockItem
+from .repository import (
+    ShopRepository, STOCK_FIELDS, SALE_FIELDS, STOCK_DTYPES, SALE_DTYPES,
+    capture_cost_basis, check_sale, ensure_product_id, sale_frame, typed_frame, with_cost_basis
+)
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock (
+    product_id TEXT PRIMARY KEY,
+    product_name TEXT NOT NULL,
+    date_added TEXT NOT NULL,
+    purchase_price REAL NOT NULL,
+    selling_price REAL NOT NULL,
+    supplier TEXT NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    sale_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id TEXT NOT NULL,
+    date_of_sale TEXT NOT NULL,
+    quantity_sold INTEGER NOT NULL,
+    total_price REAL NOT NULL,
+    product_name TEXT,
+    unit_price REAL,
+    unit_cost REAL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_product_id ON sales (product_id);
+CREATE INDEX IF NOT EXISTS idx_sales_date_of_sale ON sales (date_of_sale);
+"""
+
+# Columns added to sales after the first release, for databases created before them
+SALES_MIGRATIONS = {
+    'product_name': 'ALTER TABLE sales ADD COLUMN product_name TEXT',
+    'unit_price': 'ALTER TABLE sales ADD COLUMN unit_price REAL',
+    'unit_cost': 'ALTER TABLE sales ADD COLUMN unit_cost REAL',
+}
+
+
+class SQLiteRepository(ShopRepository):
+    """Stock and sales in a local SQLite database
+
+    Sales are indexed on product_id and date_of_sale and loaded in date
+    order, so building the in-memory SalesTimeIndex needs no sort.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        existing = {row[1] for row in self._conn.execute('PRAGMA table_info(sales)')}
+        for column, statement in SALES_MIGRATIONS.items():
+            if column not in existing:
+                self._conn.execute(statement)
+        self._conn.commit()
+        self._writes = 0
+
+    @property
+    def version(self):
+        # data_version also changes when another connection commits
+        with self._lock:
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            return self._writes, data_version
+
+    def get_stock(self, product_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(STOCK_FIELDS)} FROM stock WHERE product_id = ?", (product_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return StockItem(**dict(zip(STOCK_FIELDS, row)))
+
+    def add_stock(self, item):
+        ensure_product_id(item)
+        with self._lock:
+            before = self.version
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        f"INSERT INTO stock ({', '.join(STOCK_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        self._stock_row(item)
+                    )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Product ID {item.product_id} already exists")
+            self._writes += 1
+            self._patch_cached(
+                before,
+                catalog=lambda catalog: catalog.add(item),
+                aggregates=lambda aggregates: aggregates.set_product_name(item.product_id, item.product_name)
+            )
+        return item
+
+    def set_quantity(self, product_id, quantity):
+        with self._lock:
+            before = self.version
+            with self._conn:
+                cursor = self._conn.execute(
+                    'UPDATE stock SET quantity = ? WHERE product_id = ?', (quantity, product_id)
+                )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Product ID {product_id} not found")
+            self._writes += 1
+            self._patch_cached(
+                before,
+                catalog=lambda catalog: catalog.set_quantity(product_id, quantity),
+                aggregates=None
+            )
+
+    def record_sale(self, sale):
+        with self._lock:
+            before = self.version
+            item = self.get_stock(sale.product_id)
+            with self._conn:
+                # Conditional decrement keeps the stock check and update atomic
+                cursor = self._conn.execute(
+                    'UPDATE stock SET quantity = quantity - ? WHERE product_id = ? AND quantity >= ?',
+                    (sale.quantity_sold, sale.product_id, sale.quantity_sold)
+                )
+                if cursor.rowcount == 0:
+                    check_sale(item, sale)
+                    raise ValueError(f"Stock for Product ID {sale.product_id} changed, please retry")
+                capture_cost_basis(item, sale)
+                self._conn.execute(
+                    f"INSERT INTO sales ({', '.join(SALE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._sale_row(sale)
+                )
+            self._writes += 1
+            self._patch_cached(
+                before,
+                catalog=lambda catalog: catalog.decrement(sale.product_id, sale.quantity_sold),
+                aggregates=lambda aggregates: aggregates.add_sale(sale)
+            )
+            row = sale_frame(sale)
+            # As stored: to the second
+            self._append_cached_sale(before, row.assign(date_of_sale=row['date_of_sale'].dt.floor('s')))
+        return sale
+
+    def import_stock(self, chunks):
+        # One transaction: readers keep seeing the old stock until the import commits
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM stock')
+                rows = 0
+                for chunk in chunks:
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO stock ({', '.join(STOCK_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        self._frame_rows(chunk, STOCK_FIELDS, 'date_added')
+                    )
+                    rows += len(chunk)
+                if not rows:
+                    # Nothing valid to import; undo the DELETE and keep the current stock
+                    self._conn.rollback()
+                    return
+            self._writes += 1
+
+    def import_sales(self, chunks):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM sales')
+                rows = 0
+                for chunk in chunks:
+                    self._conn.executemany(
+                        f"INSERT INTO sales ({', '.join(SALE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        self._frame_rows(chunk, SALE_FIELDS, 'date_of_sale')
+                    )
+                    rows += len(chunk)
+                if not rows:
+                    self._conn.rollback()
+                    return
+            self._writes += 1
+
+    def _load_stock_frame(self):
+        with self._lock:
+            frame = pd.read_sql_query(f"SELECT {', '.join(STOCK_FIELDS)} FROM stock", self._conn)
+        frame['date_added'] = pd.to_datetime(frame['date_added'], format=DATE_FORMAT)
+        return typed_frame(frame, STOCK_FIELDS, STOCK_DTYPES)
+
+    def recent_sales(self, n=5):
+        # Walks idx_sales_date_of_sale backwards (the index ends with the rowid, sale_id)
+        with self._lock:
+            frame = pd.read_sql_query(
+                f"SELECT {', '.join(SALE_FIELDS)} FROM sales ORDER BY date_of_sale DESC, sale_id DESC LIMIT ?",
+                self._conn,
+                params=(n,)
+            )
+        frame['date_of_sale'] = pd.to_datetime(frame['date_of_sale'], format=DATE_FORMAT)
+        return with_cost_basis(typed_frame(frame, SALE_FIELDS, SALE_DTYPES), self.stock_frame)
+
+    def _load_sales_frame(self):
+        return self._query_sales('', [])
+
+    def _query_sales(self, where, params):
+        with self._lock:
+            frame = pd.read_sql_query(
+                f"SELECT {', '.join(SALE_FIELDS)} FROM sales{where} ORDER BY date_of_sale, sale_id",
+                self._conn,
+                params=params
+            )
+        frame['date_of_sale'] = pd.to_datetime(frame['date_of_sale'], format=DATE_FORMAT)
+        return typed_frame(frame, SALE_FIELDS, SALE_DTYPES)
+
+    @staticmethod
+    def _frame_rows(frame, fields, date_column):
+        """Rows of a typed frame as plain Python tuples, dates formatted in one pass"""
+        frame = frame.assign(**{date_column: frame[date_column].dt.strftime(DATE_FORMAT)})
+        return frame[fields].astype(object).itertuples(index=False, name=None)
+
+    @staticmethod
+    def _stock_row(item):
+        return (
+            item.product_id, item.product_name, item.date_added.strftime(DATE_FORMAT),
+            item.purchase_price, item.selling_price, item.supplier, item.quantity
+        )
+
+    @staticmethod
+    def _sale_row(sale):
+        return (
+            sale.product_id, sale.date_of_sale.strftime(DATE_FORMAT),
+            sale.quantity_sold, sale.total_price,
+            sale.product_name, sale.unit_price, sale.unit_cost
+        )
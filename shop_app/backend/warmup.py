@@ -0,0 +1,47 @@
+import logging
+import threading
+
+from . import config
+from .metrics import span
+
+logger = logging.getLogger('shop_app.warmup')
+
+_thread = None
+_lock = threading.Lock()
+
+
+def _warm():
+    from .repository import create_repository
+
+    try:
+        with span('warmup', backend=config.STORAGE_BACKEND):
+            # Builds the shared caches every page reads first
+            repo = create_repository()
+            repo.stock_frame()
+            repo.catalog()
+            repo.sales_index()
+            repo.aggregates()
+
+            # Loaded on the first chart spec cache miss
+            import altair  # noqa: F401
+
+            if config.STORAGE_BACKEND == 'sheets' and not config.SHEETS_EMULATOR:
+                # Credentials and the discovery document are shared by every thread's service
+                from .sheets_client import get_client_manager
+                get_client_manager().get_service()
+    except Exception as e:
+        # The page that needs the failing piece reports the error itself
+        logger.warning(f"Warmup failed: {e}")
+
+
+def start_warmup():
+    """Warm the process's caches and lazy imports once, in a background thread
+
+    Safe to call on every page run; only the first call starts the thread.
+    """
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm, name='warmup', daemon=True)
+            _thread.start()
+    return _thread
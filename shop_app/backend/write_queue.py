@@ -0,0 +1,241 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from .exceptions import SheetOperationError
+
+WriteTicket = namedtuple('WriteTicket', ['ticket_id', 'range_name', 'queued_at'])
+
+
+class WriteBehindQueue:
+    """Journaled queue that coalesces row appends into one request per range
+
+    Every row is written to a local journal and fsync'd before its ticket is
+    returned, so a crash between enqueue and flush never loses a row: pending
+    rows are replayed from the journal when the queue is created again.
+    Rows leave the queue only after the append request for them has succeeded.
+    listeners are attached before the journal is replayed, so flushes of
+    replayed rows reach them too.
+    """
+
+    def __init__(self, sender, journal_path, max_batch_rows=50, max_age_seconds=2.0,
+                 retry_seconds=5.0, listeners=()):
+        self._sender = sender
+        self._journal_path = journal_path
+        self.max_batch_rows = max_batch_rows
+        self.max_age_seconds = max_age_seconds
+        self.retry_seconds = retry_seconds
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        # range_name -> OrderedDict(ticket_id -> (queued_at, row))
+        self._pending = {}
+        self._retry_after = {}
+        self._listeners = list(listeners)
+        self._worker = None
+        self._closed = False
+        self._stats = {
+            'flushes': 0,
+            'rows_flushed': 0,
+            'failures': 0,
+            'last_flush_seconds': 0.0,
+            'flush_seconds_total': 0.0,
+        }
+
+        directory = os.path.dirname(journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._replay_journal()
+        self._journal = open(journal_path, 'a', encoding='utf-8')
+        if self._pending:
+            self._ensure_worker()
+        atexit.register(self.close)
+
+    def enqueue(self, range_name, row):
+        """Durably queue one row for appending and return its ticket"""
+        ticket = WriteTicket(uuid.uuid4().hex, range_name, time.time())
+        with self._lock:
+            if self._closed:
+                raise SheetOperationError("Write queue is closed")
+            self._write_journal({
+                'op': 'queued',
+                'ticket': ticket.ticket_id,
+                'range': range_name,
+                'queued_at': ticket.queued_at,
+                'row': row,
+            })
+            self._pending.setdefault(range_name, OrderedDict())[ticket.ticket_id] = (ticket.queued_at, row)
+            self._ensure_worker()
+            self._wakeup.notify()
+        return ticket
+
+    def flush(self, range_name=None):
+        """Send all pending rows now (optionally for one range only)
+
+        Returns the number of rows written; raises SheetOperationError if any
+        batch fails, leaving its rows queued for a later attempt.
+        """
+        with self._lock:
+            ranges = [range_name] if range_name else list(self._pending)
+        written = 0
+        errors = []
+        for name in ranges:
+            try:
+                written += self._flush_range(name)
+            except SheetOperationError as e:
+                errors.append(str(e))
+        if errors:
+            raise SheetOperationError("; ".join(errors))
+        return written
+
+    def is_pending(self, ticket_id):
+        """Return True while the ticket's row has not been written to the sheet"""
+        with self._lock:
+            return any(ticket_id in rows for rows in self._pending.values())
+
+    def depth(self, range_name=None):
+        """Number of rows waiting to be written"""
+        with self._lock:
+            if range_name:
+                return len(self._pending.get(range_name, ()))
+            return sum(len(rows) for rows in self._pending.values())
+
+    def add_listener(self, callback):
+        """Call callback(range_name, rows, response) after every successful flush"""
+        self._listeners.append(callback)
+
+    def stats(self):
+        """Return queue depth, oldest pending age and flush latency counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['depth'] = sum(len(rows) for rows in self._pending.values())
+            oldest = [next(iter(rows.values()))[0] for rows in self._pending.values() if rows]
+        stats['oldest_age_seconds'] = time.time() - min(oldest) if oldest else 0.0
+        stats['avg_flush_seconds'] = (
+            stats['flush_seconds_total'] / stats['flushes'] if stats['flushes'] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Flush what can be flushed and stop the background worker"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify_all()
+        try:
+            self.flush()
+        except SheetOperationError:
+            pass  # Rows stay in the journal and are replayed on next start
+        self._journal.close()
+
+    def _flush_range(self, range_name):
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending.get(range_name)
+                if not pending or self._journal.closed:
+                    return 0
+                batch = list(pending.items())
+
+            tickets = [ticket_id for ticket_id, _ in batch]
+            rows = [row for _, (_, row) in batch]
+            started = time.perf_counter()
+            try:
+                response = self._sender(range_name, rows)
+            except Exception as e:
+                with self._lock:
+                    self._stats['failures'] += 1
+                    self._retry_after[range_name] = time.time() + self.retry_seconds
+                raise SheetOperationError(f"Failed to flush {len(rows)} rows to {range_name}: {str(e)}")
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                for ticket_id in tickets:
+                    pending.pop(ticket_id, None)
+                if not pending:
+                    del self._pending[range_name]
+                self._retry_after.pop(range_name, None)
+                self._write_journal({'op': 'flushed', 'tickets': tickets})
+                if not self._pending:
+                    self._compact_journal()
+                self._stats['flushes'] += 1
+                self._stats['rows_flushed'] += len(rows)
+                self._stats['last_flush_seconds'] = elapsed
+                self._stats['flush_seconds_total'] += elapsed
+
+        for listener in self._listeners:
+            listener(range_name, rows, response)
+        return len(rows)
+
+    def _due_ranges(self):
+        now = time.time()
+        due = []
+        next_deadline = None
+        for name, rows in self._pending.items():
+            if not rows:
+                continue
+            deadline = next(iter(rows.values()))[0] + self.max_age_seconds
+            if len(rows) >= self.max_batch_rows:
+                deadline = now
+            deadline = max(deadline, self._retry_after.get(name, 0))
+            if deadline <= now:
+                due.append(name)
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        return due, next_deadline
+
+    def _run(self):
+        while True:
+            with self._lock:
+                due, next_deadline = self._due_ranges()
+                while not due and not self._closed:
+                    timeout = None if next_deadline is None else max(next_deadline - time.time(), 0)
+                    self._wakeup.wait(timeout)
+                    due, next_deadline = self._due_ranges()
+                if self._closed:
+                    self._worker = None
+                    return
+            for name in due:
+                try:
+                    self._flush_range(name)
+                except SheetOperationError:
+                    pass  # Counted in stats and retried after retry_seconds
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name='sheets-write-queue', daemon=True)
+            self._worker.start()
+
+    def _write_journal(self, entry):
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _compact_journal(self):
+        # Everything in the journal has been flushed, so it can start over empty
+        self._journal.seek(0)
+        self._journal.truncate()
+
+    def _replay_journal(self):
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from a crash mid-write
+                if entry.get('op') == 'queued':
+                    self._pending.setdefault(entry['range'], OrderedDict())[entry['ticket']] = (
+                        entry['queued_at'], entry['row']
+                    )
+                elif entry.get('op') == 'flushed':
+                    for rows in self._pending.values():
+                        for ticket_id in entry['tickets']:
+                            rows.pop(ticket_id, None)
+        self._pending = {name: rows for name, rows in self._pending.items() if rows}
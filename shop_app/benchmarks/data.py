@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backend.repository import STOCK_FIELDS, SALE_FIELDS, STOCK_DTYPES, SALE_DTYPES
+
+SUPPLIERS = 200
+# Fixed so that generated histories (and their date windows) are identical between runs
+END_DATE = datetime(2025, 1, 1)
+
+_WORDS = np.array([
+    'Apple', 'Basil', 'Bread', 'Butter', 'Candle', 'Cable', 'Charger', 'Coffee', 'Cookie', 'Cup',
+    'Detergent', 'Flour', 'Glue', 'Honey', 'Juice', 'Lamp', 'Milk', 'Noodles', 'Oil', 'Pasta',
+    'Pen', 'Pepper', 'Rice', 'Salt', 'Shampoo', 'Soap', 'Sugar', 'Tea', 'Tissue', 'Towel',
+], dtype=object)
+_SIZES = np.array(['Small', 'Medium', 'Large', 'Family', 'Mini', 'XL'], dtype=object)
+
+
+def generate_stock(products, seed=0):
+    """Stock frame with `products` SKUs: prices, suppliers and quantities drawn from seed"""
+    rng = np.random.default_rng(seed)
+    ids = np.char.add('SKU', np.arange(products).astype(str)).astype(object)
+    names = _WORDS[rng.integers(0, len(_WORDS), products)] + ' ' + _SIZES[rng.integers(0, len(_SIZES), products)] \
+        + ' ' + np.arange(products).astype(str).astype(object)
+    purchase = np.round(rng.lognormal(mean=1.5, sigma=0.8, size=products), 2)
+    selling = np.round(purchase * rng.uniform(1.1, 1.8, products), 2)
+    suppliers = np.char.add('Supplier ', rng.integers(0, SUPPLIERS, products).astype(str)).astype(object)
+    added = pd.Timestamp(END_DATE) - pd.to_timedelta(rng.integers(365, 3 * 365, products), unit='D')
+    frame = pd.DataFrame({
+        'product_id': ids,
+        'product_name': names,
+        'date_added': added,
+        'purchase_price': purchase,
+        'selling_price': selling,
+        'supplier': suppliers,
+        'quantity': rng.integers(0, 500, products),
+    }, columns=STOCK_FIELDS)
+    return frame.astype(STOCK_DTYPES)
+
+
+def generate_sales(stock, sales, days=365, seed=0):
+    """Time-ordered sales over the last `days` days, with popular products selling more (Zipf-like)"""
+    rng = np.random.default_rng(seed + 1)
+    products = len(stock)
+    popularity = 1.0 / np.arange(1, products + 1) ** 1.1
+    picks = rng.choice(products, size=sales, p=popularity / popularity.sum())
+    quantity = rng.integers(1, 6, sales)
+    offsets = np.sort(rng.integers(0, days * 86400, sales))
+    start = pd.Timestamp(END_DATE) - pd.Timedelta(days=days)
+    unit_price = stock['selling_price'].to_numpy()[picks]
+    frame = pd.DataFrame({
+        'product_id': stock['product_id'].to_numpy()[picks],
+        'date_of_sale': start + pd.to_timedelta(offsets, unit='s'),
+        'quantity_sold': quantity,
+        'total_price': np.round(unit_price * quantity, 2),
+        'product_name': stock['product_name'].to_numpy()[picks],
+        'unit_price': unit_price,
+        'unit_cost': stock['purchase_price'].to_numpy()[picks],
+    }, columns=SALE_FIELDS)
+    return frame.astype(SALE_DTYPES)
+
+
+def stock_sheet_rows(stock):
+    """Stock frame as Stock sheet rows (sheet column order, Python values)"""
+    frame = stock[['product_name', 'date_added', 'purchase_price', 'selling_price', 'supplier', 'quantity', 'product_id']]
+    return [list(row) for row in frame.astype(object).itertuples(index=False, name=None)]
+
+
+def sales_sheet_rows(sales):
+    """Sales frame as Sales sheet rows (sheet column order, Python values)"""
+    frame = sales[SALE_FIELDS]
+    return [list(row) for row in frame.astype(object).itertuples(index=False, name=None)]
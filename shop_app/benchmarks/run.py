@@ -0,0 +1,343 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+# The Sheets cases run against the in-process emulator; set before backend.config is imported
+_WORK_DIR = tempfile.mkdtemp(prefix='shop_bench_')
+os.environ.setdefault('SHEETS_EMULATOR', 'true')
+os.environ.setdefault('SHEETS_EMULATOR_SEED', '0')
+os.environ.setdefault('SHEETS_REQUESTS_PER_MINUTE', '1000000')
+os.environ.setdefault('WRITE_QUEUE_JOURNAL', os.path.join(_WORK_DIR, 'write_queue.jsonl'))
+
+from backend.models import SaleRecord  # noqa: E402
+from backend.repository import MemoryRepository  # noqa: E402
+from benchmarks.data import END_DATE, generate_stock, generate_sales, stock_sheet_rows, sales_sheet_rows  # noqa: E402
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# products/sales for the repository cases; sheet_* for the (slower, row-by-row) Sheets cases
+SCALES = {
+    'small': {'products': 1_000, 'sales': 100_000, 'sheet_products': 500, 'sheet_sales': 5_000},
+    'medium': {'products': 10_000, 'sales': 1_000_000, 'sheet_products': 2_000, 'sheet_sales': 20_000},
+    'large': {'products': 50_000, 'sales': 5_000_000, 'sheet_products': 5_000, 'sheet_sales': 50_000},
+}
+
+CASES = {}
+
+
+def case(name):
+    """Register a case: setup(data) is untimed and returns the run() callable that is timed"""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+class Data:
+    """Generated data for one scale, built on first use"""
+
+    def __init__(self, scale, seed):
+        self.scale = SCALES[scale]
+        self.seed = seed
+        self._cache = {}
+
+    def get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def stock(self):
+        return self.get('stock', lambda: generate_stock(self.scale['products'], self.seed))
+
+    @property
+    def sales(self):
+        return self.get('sales', lambda: generate_sales(self.stock, self.scale['sales'], seed=self.seed))
+
+    def repository(self):
+        repo = MemoryRepository()
+        repo.import_stock([self.stock])
+        repo.import_sales([self.sales])
+        return repo
+
+    def load_emulator(self):
+        from backend.sheets_emulator import get_emulator
+        from backend.sheets_utils import STOCK_COLUMNS, SALES_COLUMNS, invalidate_read_cache
+
+        stock = self.get('sheet_stock', lambda: generate_stock(self.scale['sheet_products'], self.seed))
+        sales = self.get('sheet_sales', lambda: generate_sales(stock, self.scale['sheet_sales'], seed=self.seed))
+        emulator = get_emulator()
+        emulator.set_rows('Stock', [STOCK_COLUMNS] + stock_sheet_rows(stock))
+        emulator.set_rows('Sales', [SALES_COLUMNS] + sales_sheet_rows(sales))
+        invalidate_read_cache()
+        return stock
+
+
+# Sales History page: window filter, aggregates, trend buckets, top products, details page
+
+@case('history_cold')
+def history_cold(data):
+    repo = data.repository()
+
+    def run():
+        from backend.charts import sales_trend
+        week = (END_DATE - timedelta(weeks=1), END_DATE)
+        index = repo.sales_index()
+        aggregates = repo.aggregates()
+        for window in (week, (None, None)):
+            aggregates.summary(*window)
+            sales_trend(aggregates, *window)
+            aggregates.top_products(*window, n=10, by='total_price')
+            aggregates.top_products(*window, n=10, by='profit')
+            index.page(*window, page=0, page_size=50)
+        return len(index)
+    return run
+
+
+@case('history_rerun')
+def history_rerun(data):
+    repo = data.repository()
+    # Build the index and aggregates up front, as the first page load would
+    repo.sales_index()
+    repo.aggregates()
+
+    def run():
+        week = (END_DATE - timedelta(weeks=1), END_DATE)
+        index = repo.sales_index()
+        aggregates = repo.aggregates()
+        aggregates.summary(*week)
+        page, matching = index.page(*week, page=3, page_size=50, sort_by='total_price', search='tea')
+        return matching
+    return run
+
+
+# Record Sale page: catalog search and lookups, then recording sales
+
+@case('record_sale')
+def record_sale(data):
+    repo = data.repository()
+    prefixes = ['', 'a', 'Co', 'Sh', 'Tea', 'x']
+
+    def run():
+        catalog = repo.catalog()
+        recorded = 0
+        for i in range(1_000):
+            matches = catalog.search(prefixes[i % len(prefixes)], limit=200)
+            item = matches[0] if matches else None
+            if item is not None and item.quantity > 0:
+                repo.record_sale(SaleRecord(product_id=item.product_id, quantity_sold=1,
+                                            total_price=item.selling_price))
+                recorded += 1
+        return recorded
+    return run
+
+
+# Home page: CSV export and streaming import
+
+@case('csv_export')
+def csv_export(data):
+    from backend.csv_export import export_csv
+    repo = data.repository()
+
+    def run():
+        return len(export_csv(repo, 'sales'))
+    return run
+
+
+@case('csv_import')
+def csv_import(data):
+    from backend.csv_export import write_csv
+    from backend.csv_import import import_csv
+    payload = write_csv(data.sales)
+
+    def run():
+        report = import_csv(MemoryRepository(), io.BytesIO(payload), 'sales')
+        return report.rows_imported
+    return run
+
+
+# export_utils against the emulated Sheets API
+
+def _excel_case(export):
+    def setup(data):
+        data.load_emulator()
+        from backend.sheets_utils import invalidate_read_cache
+
+        def run():
+            invalidate_read_cache()
+            filename = export(_WORK_DIR)
+            return os.path.getsize(filename) if filename else 0
+        return run
+    return setup
+
+
+@case('excel_stock')
+def excel_stock(data):
+    from backend.export_utils import export_stock_data
+    return _excel_case(export_stock_data)(data)
+
+
+@case('excel_sales')
+def excel_sales(data):
+    from backend.export_utils import export_sales_data
+    return _excel_case(export_sales_data)(data)
+
+
+@case('excel_combined')
+def excel_combined(data):
+    from backend.export_utils import export_combined_data
+    return _excel_case(export_combined_data)(data)
+
+
+# sheets_utils round-trips: cold batched read, queued sale appends with tail read, cell updates
+
+@case('sheets_round_trip')
+def sheets_round_trip(data):
+    from backend import sheets_utils
+    stock = data.load_emulator()
+    product_ids = list(stock['product_id'][:20])
+
+    def run():
+        sheets_utils.invalidate_read_cache()
+        stock_df, sales_df = sheets_utils.read_stock_and_sales()
+        for i in range(100):
+            sheets_utils.record_sale(product_ids[i % len(product_ids)], 1, 1.0)
+        sheets_utils.get_write_queue().flush()
+        stock_df, sales_df = sheets_utils.read_stock_and_sales()
+        for product_id in product_ids:
+            sheets_utils.update_stock_quantity(product_id, 10)
+        return len(sales_df)
+    return run
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(name, scale, seed, repeat):
+    """Run one case in this process and return its measurements"""
+    data = Data(scale, seed)
+    timings = []
+    result = None
+    setup_peak = None
+    for _ in range(repeat):
+        run = CASES[name](data)
+        if setup_peak is None:
+            setup_peak = _peak_rss_mb()
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return {
+        'seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'repeat': repeat,
+        'setup_peak_rss_mb': round(setup_peak, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'result': result,
+    }
+
+
+def run_isolated(name, scale, seed, repeat):
+    """Run a case in a fresh interpreter so its peak RSS is its own"""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run', '--case', name, '--scale', scale,
+         '--seed', str(seed), '--repeat', str(repeat)],
+        cwd=os.path.dirname(BENCHMARK_DIR), capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against baseline: (case, metric, baseline, current)"""
+    regressions = []
+    for name, current in results['cases'].items():
+        reference = baseline.get('cases', {}).get(name)
+        if reference is None or 'error' in reference:
+            continue
+        if 'error' in current:
+            regressions.append((name, 'error', None, current['error']))
+            continue
+        for metric in ('seconds', 'peak_rss_mb'):
+            if current[metric] > reference[metric] * (1 + tolerance):
+                regressions.append((name, metric, reference[metric], current[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shop app benchmarks")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*', choices=CASES, help="Cases to run (default: all)")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--no-compare', action='store_true', help="Only report timings; skip the baseline check")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown/growth, e.g. 0.25 = 25%%")
+    parser.add_argument('--case', help=argparse.SUPPRESS)  # Child process mode
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.scale, args.seed, args.repeat)))
+        return 0
+
+    results = {
+        'scale': args.scale,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': {},
+    }
+    for name in args.only or CASES:
+        measurement = run_isolated(name, args.scale, args.seed, args.repeat)
+        results['cases'][name] = measurement
+        if 'error' in measurement:
+            print(f"{name:20} ERROR {measurement['error']}")
+        else:
+            print(f"{name:20} {measurement['seconds']:9.3f}s  peak {measurement['peak_rss_mb']:8.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if args.no_compare:
+        return 0
+
+    # Without a usable baseline nothing was checked, which must not pass as "no regressions"
+    if not os.path.exists(args.baseline):
+        print(f"ERROR no baseline at {args.baseline}; record one with --save-baseline or pass --no-compare")
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('scale') != args.scale:
+        print(f"ERROR baseline was recorded at scale '{baseline.get('scale')}', not '{args.scale}'; "
+              f"record one at this scale with --save-baseline or pass --no-compare")
+        return 2
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, reference, current in regressions:
+        print(f"REGRESSION {name} {metric}: {reference} -> {current}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
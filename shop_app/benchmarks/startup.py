@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['Home.py'] + sorted(
+    os.path.join('pages', name) for name in os.listdir(os.path.join(APP_DIR, 'pages')) if name.endswith('.py')
+)
+
+# Runs in a fresh interpreter: the harness import is timed apart from the page's own work
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.run()
+first = time.perf_counter()
+app.run()
+second = time.perf_counter()
+print(json.dumps({
+    'harness_seconds': harness - started,
+    'first_render_seconds': first - harness,
+    'rerun_seconds': second - first,
+    'exceptions': [str(e.value) for e in app.exception],
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """{top-level package: cumulative seconds} from python -X importtime output"""
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name[1:]  # One separator space; the rest is nesting
+        if name.startswith(' '):
+            continue  # Counted in its top-level import's cumulative time
+        totals[name.split('.')[0]] += int(cumulative) / 1e6
+    return dict(totals)
+
+
+def measure(page, env=None):
+    """First-render and rerun time of a page in a fresh process, with its import breakdown"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE, page],
+        cwd=APP_DIR, capture_output=True, text=True, env={**os.environ, **(env or {})}
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+    # The harness import is reported separately; what streamlit itself loads is not the page's cost
+    imports.pop('streamlit', None)
+    result['imports'] = dict(sorted(imports.items(), key=lambda item: -item[1]))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Page cold-start and import-time report")
+    parser.add_argument('pages', nargs='*', default=PAGES, help="Page scripts relative to shop_app")
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list per page")
+    parser.add_argument('--output', help="Write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for page in args.pages:
+        result = report[page] = measure(page)
+        if 'error' in result:
+            print(f"{page}: ERROR {result['error']}")
+            continue
+        print(f"{page}: first render {result['first_render_seconds']:.3f}s, "
+              f"rerun {result['rerun_seconds']:.3f}s")
+        for package, seconds in list(result['imports'].items())[:args.top]:
+            print(f"    {seconds * 1000:9.1f} ms  {package}")
+        for message in result['exceptions']:
+            print(f"    exception: {message}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,8 @@
 import streamlit as st
-import uuid
-from datetime import datetime
-import pandas as pd
+from backend.models import StockItem
+from backend.codec import CURRENCY_DISPLAY_FORMAT
+from backend.repository import create_repository
+from backend.metrics import begin_request, span
 
 # Set page title and favicon
 st.set_page_config(
@@ -10,11 +11,11 @@ st.set_page_config(
 )
 
 def render():
+    begin_request('add_stock', trace=st.query_params.get('trace') == '1')
+
     st.header("Add New Stock")
     
-    # Initialize session state if needed
-    if 'stock_data' not in st.session_state:
-        st.session_state.stock_data = []
+    repo = create_repository()
     
     with st.form("add_stock_form", clear_on_submit=True):
         product_name = st.text_input("Product Name")
@@ -34,17 +35,16 @@ def render():
                 return
                 
             try:
-                product_data = {
-                    "product_id": str(uuid.uuid4()),
-                    "product_name": product_name,
-                    "purchase_price": purchase_price,
-                    "selling_price": selling_price,
-                    "supplier": supplier,
-                    "quantity": quantity,
-                    "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                item = StockItem(
+                    product_name=product_name,
+                    purchase_price=purchase_price,
+                    selling_price=selling_price,
+                    supplier=supplier,
+                    quantity=int(quantity)
+                )
                 
-                st.session_state.stock_data.append(product_data)
+                with span('page.render', page='add_stock', block='add'):
+                    repo.add_stock(item)
                 st.success("Stock added successfully!")
                 st.balloons()
                 
@@ -53,13 +53,11 @@ def render():
                 
     # Show current stock
     st.subheader("Current Stock")
-    if st.session_state.stock_data:
-        stock_df = pd.DataFrame(st.session_state.stock_data)
-        
-        # Format currency columns
-        stock_df['purchase_price'] = stock_df['purchase_price'].apply(lambda x: f"${x:.2f}")
-        stock_df['selling_price'] = stock_df['selling_price'].apply(lambda x: f"${x:.2f}")
-        
+    with span('page.render', page='add_stock', block='stock') as timing:
+        stock_df = repo.stock_frame()
+        timing.record(rows=len(stock_df))
+    if not stock_df.empty:
+        # Currency is formatted by the grid; the typed numbers are sent as-is
         st.dataframe(
             stock_df,
             use_container_width=True,
@@ -67,7 +65,11 @@ def render():
             column_order=[
                 'product_name', 'quantity', 'selling_price', 
                 'purchase_price', 'supplier', 'date_added', 'product_id'
-            ]
+            ],
+            column_config={
+                'selling_price': st.column_config.NumberColumn(format=CURRENCY_DISPLAY_FORMAT),
+                'purchase_price': st.column_config.NumberColumn(format=CURRENCY_DISPLAY_FORMAT),
+            }
         )
     else:
         st.info("No stock items found")
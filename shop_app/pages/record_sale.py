@@ -1,83 +1,79 @@
 import streamlit as st
-from datetime import datetime
-import pandas as pd
+from backend.models import SaleRecord
+from backend.codec import CURRENCY_DISPLAY_FORMAT, DATETIME_DISPLAY_FORMAT
+from backend.repository import create_repository
+from backend.metrics import begin_request, span
+
+begin_request('record_sale', trace=st.query_params.get('trace') == '1')
 
 st.header("Record Sale")
 
-# Initialize session state if needed
-if 'stock_data' not in st.session_state:
-    st.session_state.stock_data = []
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = []
+PRODUCT_OPTIONS_LIMIT = 200
+
+repo = create_repository()
 
-if not st.session_state.stock_data:
+# Indexed catalog: lookups and the in-stock view don't scan all products
+catalog = repo.catalog()
+if not len(catalog):
     st.error("No products in stock. Please add stock first!")
     st.stop()
 
-# Convert stock data to DataFrame
-stock_df = pd.DataFrame(st.session_state.stock_data)
-
-# Only show products with quantity > 0
-available_stock = stock_df[stock_df['quantity'] > 0].copy()
-
-if available_stock.empty:
+if not catalog.in_stock_count():
     st.error("No products available in stock!")
     st.stop()
 
+# Narrow large catalogs down before building the dropdown
+search = st.text_input("Search Products", placeholder="Start typing a product name")
+with span('page.render', page='record_sale', block='search') as timing:
+    matches = catalog.search(search, limit=PRODUCT_OPTIONS_LIMIT)
+    timing.record(rows=len(matches))
+if not matches:
+    st.info(f"No products in stock matching '{search}'")
+    st.stop()
+
 with st.form("record_sale_form", clear_on_submit=True):
     # Create product selection dropdown
-    product_options = available_stock['product_name'].tolist()
-    
-    selected_product_name = st.selectbox(
+    selected_product_id = st.selectbox(
         "Select Product",
-        options=[f"{name} (Qty: {available_stock[available_stock['product_name'] == name]['quantity'].iloc[0]})" 
-                for name in product_options]
+        options=[item.product_id for item in matches],
+        format_func=lambda product_id: f"{catalog.get(product_id).product_name} (Qty: {catalog.get(product_id).quantity})"
     )
     
-    if selected_product_name:
-        selected_product_name = selected_product_name.split(" (Qty:")[0]  # Extract just the product name
-    
+    if selected_product_id:
         # Get the selected product's data
-        product_data = available_stock[available_stock['product_name'] == selected_product_name].iloc[0]
+        product_data = catalog.get(selected_product_id)
         
         # Show product details
         col1, col2 = st.columns(2)
         with col1:
-            st.info(f"Selling Price: ${float(product_data['selling_price']):.2f}")
+            st.info(f"Selling Price: ${product_data.selling_price:.2f}")
         with col2:
-            st.info(f"Available Quantity: {int(product_data['quantity'])}")
+            st.info(f"Available Quantity: {product_data.quantity}")
         
         # Quantity input
         quantity = st.number_input(
             "Quantity to Sell",
             min_value=1,
-            max_value=int(product_data['quantity']),
+            max_value=product_data.quantity,
             step=1
         )
         
         # Calculate total price
-        total_price = quantity * float(product_data['selling_price'])
+        total_price = quantity * product_data.selling_price
         st.write(f"Total Price: ${total_price:.2f}")
         
         if st.form_submit_button("Record Sale"):
             try:
                 # Create sale record
-                sale_record = {
-                    "product_id": product_data['product_id'],
-                    "date_of_sale": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "quantity_sold": quantity,
-                    "total_price": total_price
-                }
-                
-                # Update stock quantity
-                # Find the index in the original list, not the filtered one
-                product_idx_list = [i for i, d in enumerate(st.session_state.stock_data) if d['product_id'] == product_data['product_id']]
-                if product_idx_list:
-                    product_idx = product_idx_list[0]
-                    st.session_state.stock_data[product_idx]['quantity'] -= quantity
+                sale_record = SaleRecord(
+                    product_id=product_data.product_id,
+                    quantity_sold=int(quantity),
+                    total_price=total_price
+                )
                 
-                # Add sale record
-                st.session_state.sales_data.append(sale_record)
+                # Add sale record and decrement stock in place
+                with span('page.render', page='record_sale', block='record'):
+                    repo.record_sale(sale_record)
                 
                 st.success("Sale recorded successfully!")
                 st.balloons()
@@ -88,32 +84,21 @@ with st.form("record_sale_form", clear_on_submit=True):
 
 # Show recent sales
 st.subheader("Recent Sales")
-if st.session_state.sales_data:
-    sales_df = pd.DataFrame(st.session_state.sales_data)
-    sales_df['date_of_sale'] = pd.to_datetime(sales_df['date_of_sale'])
-    
-    # Get last 5 sales
-    recent_sales = sales_df.sort_values('date_of_sale', ascending=False).head(5)
-    
-    # Add product names
-    if st.session_state.stock_data:
-        stock_df_for_merge = pd.DataFrame(st.session_state.stock_data)
-        recent_sales = recent_sales.merge(
-            stock_df_for_merge[['product_id', 'product_name']],
-            on='product_id',
-            how='left'
-        )
-    
-    # Format display
-    recent_sales['date_of_sale'] = recent_sales['date_of_sale'].dt.strftime('%Y-%m-%d %H:%M')
-    recent_sales['total_price'] = recent_sales['total_price'].apply(lambda x: f"${x:.2f}")
-    
+with span('page.render', page='record_sale', block='recent') as timing:
+    # Only the last 5 sales are read (names are stored on each sale)
+    recent_sales = repo.recent_sales(5)
+    timing.record(rows=len(recent_sales))
+if not recent_sales.empty:
     st.dataframe(
         recent_sales[[
             'date_of_sale', 'product_name', 'quantity_sold', 'total_price'
         ]],
         use_container_width=True,
-        hide_index=True
+        hide_index=True,
+        column_config={
+            'date_of_sale': st.column_config.DatetimeColumn(format=DATETIME_DISPLAY_FORMAT),
+            'total_price': st.column_config.NumberColumn(format=CURRENCY_DISPLAY_FORMAT),
+        }
     )
 else:
     st.info("No sales recorded yet")
\ No newline at end of file
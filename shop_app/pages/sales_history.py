@@ -1,17 +1,81 @@
 import streamlit as st
-from datetime import datetime, timedelta
-import pandas as pd
-import altair as alt
+import os
+from datetime import datetime, time, timedelta
+from backend import config
+from backend.repository import create_repository, sales_profit
+from backend.aggregates import whole_hours
+from backend.charts import cached_spec, sales_trend, top_products_spec, trend_spec, window_key
+from backend.codec import CURRENCY_DISPLAY_FORMAT, DATETIME_DISPLAY_FORMAT
+from backend.metrics import begin_request, span
+from backend.export_jobs import DONE, FAILED, get_export_runner
+
+EXPORT_LABELS = {'sales': "Sales Data", 'combined': "All Shop Data"}
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def session_export_jobs(runner):
+    """This session's export jobs that the runner still knows about, newest first"""
+    # Jobs whose file was evicted, or that finished without one long ago, are forgotten by the runner
+    jobs = [job for job in map(runner.get, st.session_state.get('export_jobs', [])) if job is not None]
+    st.session_state.export_jobs = [job.job_id for job in jobs]
+    return jobs[::-1]
+
+@st.fragment(run_every=1)
+def export_progress(runner):
+    """Progress of this session's running exports, refreshed every second"""
+    jobs = session_export_jobs(runner)
+    if not any(job.active for job in jobs):
+        # Everything finished: rerun the page to show the downloads and stop polling
+        st.rerun()
+    for job in jobs:
+        if job.active:
+            st.progress(job.progress, text=f"{EXPORT_LABELS[job.kind]}: {job.message}")
+
+def export_to_excel(runner, start_date, end_date):
+    """Start Excel exports in the background and offer the finished files for download"""
+    job_ids = st.session_state.setdefault('export_jobs', [])
+    col1, col2 = st.columns(2)
+    requested = []
+    if col1.button("Export Sales Data", help="Sales in the selected period"):
+        requested.append(runner.submit('sales', start_date, end_date))
+    if col2.button("Export All Shop Data", help="Stock and all sales"):
+        requested.append(runner.submit('combined'))
+    for job in requested:
+        # An identical export already running is shared, not started twice
+        if job.job_id not in job_ids:
+            job_ids.append(job.job_id)
+
+    jobs = session_export_jobs(runner)
+    if any(job.active for job in jobs):
+        export_progress(runner)
+    for job in jobs:
+        if job.status == DONE and job.filename:
+            data = runner.read(job.job_id)
+            if data is not None:
+                st.download_button(
+                    label=f"Download {EXPORT_LABELS[job.kind]} ({job.size / 1024:.0f} KB)",
+                    data=data,
+                    file_name=os.path.basename(job.filename),
+                    mime=XLSX_MIME,
+                    key=f"download_{job.job_id}"
+                )
+        elif job.status == DONE:
+            st.caption(f"{EXPORT_LABELS[job.kind]}: nothing to export")
+        elif job.status == FAILED:
+            st.error(f"Error exporting {EXPORT_LABELS[job.kind].lower()}: {job.error}")
+
+# ?trace=1 logs every timing span of this run, not only the slow ones
+begin_request('sales_history', trace=st.query_params.get('trace') == '1')
 
 st.header("Sales History")
 
-# Initialize session state if needed
-if 'stock_data' not in st.session_state:
-    st.session_state.stock_data = []
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = []
+with span('page.render', page='sales_history', block='load') as timing:
+    repo = create_repository()
 
-if not st.session_state.sales_data:
+    # Typed, cached frames (dates are already datetime64)
+    sales_df = repo.sales_frame()
+    timing.record(rows=len(sales_df))
+
+if sales_df.empty:
     st.info("No sales records found.")
     st.markdown("""
         ℹ️ To get started:
@@ -21,131 +85,133 @@ if not st.session_state.sales_data:
     """)
     st.stop()
     
-# Convert data to DataFrames
-sales_df = pd.DataFrame(st.session_state.sales_data)
-stock_df = pd.DataFrame(st.session_state.stock_data)
-
-# Convert date column to datetime
-sales_df['date_of_sale'] = pd.to_datetime(sales_df['date_of_sale'])
-
 # Filter controls
 filter_type = st.radio(
     "Filter Period",
-    options=["1 Day", "1 Week", "All Time"],
+    options=["1 Day", "1 Week", "All Time", "Custom"],
     horizontal=True
 )
 
-# Calculate date range based on filter
+# Calculate date range based on filter (None means unbounded)
+sales_index = repo.sales_index()
 end_date = datetime.now()
 if filter_type == "1 Day":
     start_date = end_date - timedelta(days=1)
 elif filter_type == "1 Week":
     start_date = end_date - timedelta(weeks=1)
+elif filter_type == "Custom":
+    first_day = sales_index.first().date()
+    date_range = st.date_input(
+        "Date Range",
+        value=(max(first_day, end_date.date() - timedelta(days=30)), end_date.date()),
+        min_value=first_day,
+        max_value=end_date.date()
+    )
+    if len(date_range) != 2:
+        st.info("Select both a start and an end date")
+        st.stop()
+    start_date = datetime.combine(date_range[0], time.min)
+    end_date = datetime.combine(date_range[1], time.max)
 else:  # All Time
-    start_date = sales_df['date_of_sale'].min()
+    start_date = end_date = None
+
+# Summary totals come from hourly buckets; details and exports use the same whole hours
+start_date, end_date = whole_hours(start_date, end_date)
+if start_date is not None:
+    st.caption(f"Sales from {start_date:%Y-%m-%d %H:00} to {end_date:%Y-%m-%d %H:%M} (whole hours)")
 
-# Filter the data
-filtered_sales = sales_df[
-    (sales_df['date_of_sale'] >= start_date) & 
-    (sales_df['date_of_sale'] <= end_date)
-]
+# Dashboard numbers come from incrementally maintained aggregates
+with span('page.render', page='sales_history', block='summary'):
+    aggregates = repo.aggregates()
+    window = (start_date, end_date)
+    summary = aggregates.summary(*window)
 
-if filtered_sales.empty:
+if summary['num_sales'] == 0:
     st.info(f"No sales found for the selected period ({filter_type})")
     st.stop()
-    
-
-# Merge with stock to get product names and purchase price
-if not stock_df.empty:
-    merged_df = filtered_sales.merge(
-        stock_df[['product_id', 'product_name', 'selling_price', 'purchase_price']],
-        on='product_id',
-        how='left'
-    )
-else:
-    merged_df = filtered_sales.copy()
-    merged_df['product_name'] = 'N/A'
-    merged_df['selling_price'] = 0
-    merged_df['purchase_price'] = 0
-
-# Calculate profit per sale
-merged_df['profit'] = (pd.to_numeric(merged_df['selling_price'], errors='coerce').fillna(0) - pd.to_numeric(merged_df['purchase_price'], errors='coerce').fillna(0)) * pd.to_numeric(merged_df['quantity_sold'], errors='coerce').fillna(0)
-
-total_sales = merged_df['total_price'].sum()
 
 # Display summary metrics
 st.subheader("Sales Summary")
 col1, col2, col3, col4 = st.columns(4)
 
-total_sales = merged_df['total_price'].sum()
-total_profit = merged_df['profit'].sum()
-col1.metric("Total Sales", f"${total_sales:.2f}")
-col2.metric("Total Profit", f"${total_profit:.2f}")
-col3.metric("Number of Sales", len(merged_df))
-col4.metric("Unique Products Sold", merged_df['product_id'].nunique())
-
-
-
-# Display sales trend as interactive bar chart
-st.subheader("Sales Trend (Daily Sales)")
-daily_sales = merged_df.copy()
-daily_sales['date'] = daily_sales['date_of_sale'].dt.date
-daily_sales = daily_sales.groupby('date').agg({'total_price': 'sum', 'profit': 'sum'}).reset_index()
-
-bar_chart = alt.Chart(daily_sales).mark_bar(size=30, color='#4F8DFD').encode(
-    x=alt.X('date:T', title='Date'),
-    y=alt.Y('total_price:Q', title='Total Sales'),
-    tooltip=[alt.Tooltip('date:T', title='Date'), alt.Tooltip('total_price:Q', title='Total Sales ($)', format=',.2f'), alt.Tooltip('profit:Q', title='Profit ($)', format=',.2f')]
-).properties(
-    title='Total Sales Per Day',
-    height=350
-)
-st.altair_chart(bar_chart.interactive(), use_container_width=True)
-
-# Top selling products chart
-st.subheader("Top Selling Products")
-top_products = merged_df.groupby('product_name').agg({'total_price': 'sum', 'profit': 'sum'}).reset_index()
-top_products = top_products.sort_values('total_price', ascending=False).head(10)
-
-product_chart = alt.Chart(top_products).mark_bar(size=20, color='#00C49A').encode(
-    x=alt.X('total_price:Q', title='Total Sales ($)', axis=alt.Axis(format=',.2f')),
-    y=alt.Y('product_name:N', sort='-x', title='Product'),
-    tooltip=[alt.Tooltip('product_name:N', title='Product'), alt.Tooltip('total_price:Q', title='Total Sales ($)', format=',.2f'), alt.Tooltip('profit:Q', title='Profit ($)', format=',.2f')]
-).properties(
-    title='Top 10 Products by Sales',
-    height=350
-)
-st.altair_chart(product_chart.interactive(), use_container_width=True)
-
-# Top products by profit chart
-st.subheader("Top Profitable Products")
-top_profit_products = top_products.sort_values('profit', ascending=False).head(10)
-profit_chart = alt.Chart(top_profit_products).mark_bar(size=20, color='#FFB300').encode(
-    x=alt.X('profit:Q', title='Total Profit ($)', axis=alt.Axis(format=',.2f')),
-    y=alt.Y('product_name:N', sort='-x', title='Product'),
-    tooltip=[alt.Tooltip('product_name:N', title='Product'), alt.Tooltip('profit:Q', title='Profit ($)', format=',.2f'), alt.Tooltip('total_price:Q', title='Total Sales ($)', format=',.2f')]
-).properties(
-    title='Top 10 Products by Profit',
-    height=350
-)
-st.altair_chart(profit_chart.interactive(), use_container_width=True)
+col1.metric("Total Sales", f"${summary['total_sales']:.2f}")
+col2.metric("Total Profit", f"${summary['total_profit']:.2f}")
+col3.metric("Number of Sales", summary['num_sales'])
+col4.metric("Unique Products Sold", summary['unique_products'])
+
+# Charts are bucketed server-side and their specs cached per (window, data version)
+chart_window = window_key(*window)
+
+with span('page.render', page='sales_history', block='charts'):
+    # Display sales trend as interactive bar chart
+    st.subheader("Sales Trend")
+    trend = cached_spec(repo, 'trend', chart_window, lambda: trend_spec(*sales_trend(aggregates, *chart_window)))
+    st.vega_lite_chart(trend, use_container_width=True)
+
+    # Top selling products chart
+    st.subheader("Top Selling Products")
+    product_chart = cached_spec(repo, 'top_sales', chart_window, lambda: top_products_spec(
+        aggregates.top_products(*chart_window, n=10, by='total_price'), 'total_price', 'Top 10 Products by Sales', '#00C49A'
+    ))
+    st.vega_lite_chart(product_chart, use_container_width=True)
+
+    # Top products by profit chart
+    st.subheader("Top Profitable Products")
+    profit_chart = cached_spec(repo, 'top_profit', chart_window, lambda: top_products_spec(
+        aggregates.top_products(*chart_window, n=10, by='profit'), 'profit', 'Top 10 Products by Profit', '#FFB300'
+    ))
+    st.vega_lite_chart(profit_chart, use_container_width=True)
+
+# Excel exports read the Sheets directly, so they are offered only when the Sheets are the store
+if config.STORAGE_BACKEND == 'sheets':
+    st.subheader("Export to Excel")
+    export_to_excel(get_export_runner(), start_date, end_date)
 
 # Display detailed sales data
 st.subheader("Sales Details")
 
-# Prepare display dataframe
-display_df = merged_df.copy()
-display_df['date_of_sale'] = display_df['date_of_sale'].dt.strftime('%Y-%m-%d %H:%M')
-
-# Safely apply currency formatting
-for col in ['selling_price', 'purchase_price', 'total_price', 'profit']:
-    if col in display_df.columns:
-        display_df[col] = pd.to_numeric(display_df[col], errors='coerce').fillna(0).apply(lambda x: f"${x:.2f}")
-
-# Define columns to display
-columns_to_display = ['date_of_sale', 'product_name', 'quantity_sold', 'selling_price', 'purchase_price', 'total_price', 'profit']
-st.dataframe(
-    display_df[columns_to_display],
-    use_container_width=True,
-    hide_index=True
-)
\ No newline at end of file
+# Only the visible page is sorted, sliced and sent to the browser
+DETAILS_SORT_COLUMNS = {
+    "Date": 'date_of_sale', "Product": 'product_name', "Quantity": 'quantity_sold', "Total Price": 'total_price'
+}
+col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+search = col1.text_input("Search Product", placeholder="Product name contains...")
+sort_label = col2.selectbox("Sort By", options=list(DETAILS_SORT_COLUMNS))
+page_size = col3.selectbox("Rows Per Page", options=[25, 50, 100], index=1)
+descending = col4.checkbox("Descending", value=True)
+search = search.strip() or None
+
+matching = sales_index.count(start_date, end_date, search=search)
+if matching == 0:
+    st.info("No sales match the search")
+    st.stop()
+page_count = (matching + page_size - 1) // page_size
+page_number = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+
+with span('page.render', page='sales_history', block='details') as timing:
+    page_df, matching = sales_index.page(
+        start_date, end_date, page=page_number - 1, page_size=page_size,
+        sort_by=DETAILS_SORT_COLUMNS[sort_label], descending=descending, search=search
+    )
+    timing.record(rows=len(page_df))
+    first_row = (page_number - 1) * page_size
+    st.caption(f"Showing {first_row + 1}-{first_row + len(page_df)} of {matching} sales")
+
+    # Each sale carries its own name, price and cost basis, so no stock join is needed
+    details_df = page_df.assign(profit=sales_profit(page_df))
+
+    # Dates and currency are formatted by the grid, not per row in Python
+    currency = st.column_config.NumberColumn(format=CURRENCY_DISPLAY_FORMAT)
+    columns_to_display = ['date_of_sale', 'product_name', 'quantity_sold', 'unit_price', 'unit_cost', 'total_price', 'profit']
+    st.dataframe(
+        details_df[columns_to_display],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'date_of_sale': st.column_config.DatetimeColumn(format=DATETIME_DISPLAY_FORMAT),
+            'unit_price': currency,
+            'unit_cost': currency,
+            'total_price': currency,
+            'profit': currency,
+        }
+    )
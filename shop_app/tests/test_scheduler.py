@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from backend import scheduler as scheduler_module
+from backend.scheduler import BULK, INTERACTIVE, RequestScheduler
+from backend.sheets_emulator import EmulatedHttpError, SheetsEmulator
+
+
+@pytest.fixture
+def emulator():
+    return SheetsEmulator(sheets={'Stock': [['Product Name'], ['Tea'], ['Coffee']]})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays the scheduler asked for; the longest possible one is always chosen"""
+    delays = []
+    monkeypatch.setattr(scheduler_module.random, 'uniform', lambda low, high: high)
+    monkeypatch.setattr(scheduler_module.time, 'sleep', delays.append)
+    return delays
+
+
+def get_request(emulator, range_name='Stock!A:A'):
+    return emulator.spreadsheets().values().get(spreadsheetId='test', range=range_name)
+
+
+def test_throttled_requests_are_retried_with_exponential_backoff(emulator, sleeps):
+    emulator.error_rate = 1.0
+    scheduler = RequestScheduler(requests_per_minute=6000, max_retries=3, base_backoff=1.0, max_backoff=3.0)
+
+    with pytest.raises(EmulatedHttpError):
+        scheduler.execute(get_request(emulator))
+
+    assert sleeps == [1.0, 2.0, 3.0]  # Doubling, capped at max_backoff
+    assert emulator.stats()['injected_errors'] == 4
+    stats = scheduler.stats()['interactive']
+    assert stats['retries'] == 3
+    assert stats['throttled'] == 3
+    assert stats['failures'] == 1
+
+
+def test_request_succeeds_after_quota_frees_up(emulator, sleeps, monkeypatch):
+    emulator.quota_per_minute = 1
+    scheduler = RequestScheduler(requests_per_minute=6000, max_retries=5)
+    scheduler.execute(get_request(emulator))
+
+    def free_quota(delay):
+        sleeps.append(delay)
+        emulator._calls.clear()
+
+    monkeypatch.setattr(scheduler_module.time, 'sleep', free_quota)
+    result = scheduler.execute(get_request(emulator))
+
+    assert result['values'] == [['Product Name'], ['Tea'], ['Coffee']]
+    assert emulator.stats()['throttled'] == 1
+    assert len(sleeps) == 1
+    # A 429 empties the bucket so other callers wait instead of adding to the overload
+    assert scheduler.stats()['tokens'] < 1
+
+
+def test_non_retryable_errors_fail_at_once(emulator, sleeps):
+    scheduler = RequestScheduler(requests_per_minute=6000)
+
+    with pytest.raises(EmulatedHttpError) as error:
+        scheduler.execute(get_request(emulator, 'Missing!A:A'))
+
+    assert error.value.resp.status == 400
+    assert sleeps == []
+    assert scheduler.stats()['interactive']['failures'] == 1
+
+
+class _RecordingRequest:
+    def __init__(self, request, name, order):
+        self._request = request
+        self._name = name
+        self._order = order
+
+    def execute(self):
+        self._order.append(self._name)
+        return self._request.execute()
+
+
+def test_interactive_lane_is_served_before_queued_bulk_requests(emulator):
+    scheduler = RequestScheduler(requests_per_minute=600)  # One token every 0.1s
+    scheduler._tokens = 0.0
+    order = []
+
+    def run(name, priority):
+        scheduler.execute(_RecordingRequest(get_request(emulator), name, order), priority)
+
+    def wait_for_queued(count):
+        deadline = time.monotonic() + 5
+        while scheduler.stats()['queued'] < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    threads = []
+    for name, priority in (('bulk-1', BULK), ('bulk-2', BULK), ('interactive', INTERACTIVE)):
+        thread = threading.Thread(target=run, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        wait_for_queued(len(threads))
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ['interactive', 'bulk-1', 'bulk-2']
+    stats = scheduler.stats()
+    assert stats['interactive']['requests'] == 1
+    assert stats['bulk']['requests'] == 2
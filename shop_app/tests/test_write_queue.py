@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from backend.sheets_emulator import SheetsEmulator
+from backend.write_queue import WriteBehindQueue
+
+SALES_RANGE = 'Sales!A:G'
+
+
+@pytest.fixture
+def emulator():
+    return SheetsEmulator(sheets={'Sales': [['Product ID', 'Date of Sale', 'Quantity Sold']]})
+
+
+def sender_for(emulator):
+    def send(range_name, rows):
+        return emulator.spreadsheets().values().append(
+            spreadsheetId='test', range=range_name, valueInputOption='USER_ENTERED',
+            body={'values': rows}
+        ).execute()
+    return send
+
+
+def failing_sender(range_name, rows):
+    raise ConnectionError("offline")
+
+
+def journal_entries(path):
+    with open(path, encoding='utf-8') as journal:
+        return [json.loads(line) for line in journal if line.strip()]
+
+
+def new_queue(sender, journal_path, **kwargs):
+    # Long max age: nothing is flushed unless the test asks for it
+    return WriteBehindQueue(sender, str(journal_path), max_age_seconds=3600, retry_seconds=3600, **kwargs)
+
+
+def test_unflushed_rows_are_replayed(emulator, tmp_path):
+    journal_path = tmp_path / 'queue.jsonl'
+    queue = new_queue(failing_sender, journal_path)
+    queue.enqueue(SALES_RANGE, ['P1', '2024-01-01 10:00:00', 1])
+    queue.enqueue(SALES_RANGE, ['P2', '2024-01-01 11:00:00', 2])
+    queue.close()  # The flush fails, so both rows stay in the journal
+
+    replayed = new_queue(sender_for(emulator), journal_path)
+    assert replayed.depth(SALES_RANGE) == 2
+    assert replayed.flush() == 2
+    assert emulator.stats()['rows']['Sales'] == 2
+    assert emulator.get_values('Sales!A2:A3')['values'] == [['P1'], ['P2']]
+    replayed.close()
+
+
+def test_flushed_rows_are_not_replayed(emulator, tmp_path):
+    journal_path = tmp_path / 'queue.jsonl'
+    queue = new_queue(failing_sender, journal_path)
+    first = queue.enqueue(SALES_RANGE, ['P1', '2024-01-01 10:00:00', 1])
+    queue._sender = sender_for(emulator)
+    queue.flush()
+    queue._sender = failing_sender
+    second = queue.enqueue(SALES_RANGE, ['P2', '2024-01-01 11:00:00', 2])
+    queue.close()
+
+    replayed = new_queue(sender_for(emulator), journal_path)
+    assert not replayed.is_pending(first.ticket_id)
+    assert replayed.is_pending(second.ticket_id)
+    replayed.flush()
+    assert emulator.stats()['rows']['Sales'] == 2
+    replayed.close()
+
+
+def test_journal_is_compacted_once_everything_is_flushed(emulator, tmp_path):
+    journal_path = tmp_path / 'queue.jsonl'
+    queue = new_queue(sender_for(emulator), journal_path)
+    queue.enqueue(SALES_RANGE, ['P1', '2024-01-01 10:00:00', 1])
+    assert [entry['op'] for entry in journal_entries(journal_path)] == ['queued']
+
+    queue.flush()
+    assert journal_entries(journal_path) == []
+
+    queue.enqueue(SALES_RANGE, ['P2', '2024-01-01 11:00:00', 2])
+    assert [entry['op'] for entry in journal_entries(journal_path)] == ['queued']
+    queue.close()
+
+
+def test_torn_journal_line_is_ignored(emulator, tmp_path):
+    journal_path = tmp_path / 'queue.jsonl'
+    queue = new_queue(failing_sender, journal_path)
+    queue.enqueue(SALES_RANGE, ['P1', '2024-01-01 10:00:00', 1])
+    queue.close()
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        journal.write('{"op": "queued", "tick')
+
+    replayed = new_queue(sender_for(emulator), journal_path)
+    assert replayed.depth() == 1
+    replayed.close()
+
+
+def test_listeners_see_replayed_rows(emulator, tmp_path):
+    journal_path = tmp_path / 'queue.jsonl'
+    queue = new_queue(failing_sender, journal_path)
+    queue.enqueue(SALES_RANGE, ['P1', '2024-01-01 10:00:00', 1])
+    queue.close()
+
+    seen = []
+    # max_age_seconds=0: the worker started by the replay flushes straight away
+    replayed = WriteBehindQueue(
+        sender_for(emulator), str(journal_path), max_age_seconds=0,
+        listeners=[lambda range_name, rows, response: seen.append((range_name, rows))]
+    )
+    replayed.close()
+    assert seen == [(SALES_RANGE, [['P1', '2024-01-01 10:00:00', 1]])]